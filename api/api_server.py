@@ -14,15 +14,32 @@ Instalação:
     pip install fastapi uvicorn pydantic joblib scikit-learn pandas
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, validator
+from starlette.concurrency import run_in_threadpool
 import joblib
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
+import json
 import logging
+import os
+import sys
+import threading
+
+# Núcleo de inferência compartilhado com ml/ml_service.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ml'))
+import inference_core
+from inference_core import FEATURE_NAMES, RISK_CATEGORIES, RISK_LEVELS, risk_category_codes, score_matrix
+
+import binary_protocol
+import profiling
+from drift import DriftMonitor
+from model_curves import CurveCache
+from shadow import ShadowEvaluator
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -47,31 +64,138 @@ app.add_middleware(
 
 # ==================== CARREGAR MODELO ====================
 
-# Cache do modelo
-MODEL_CACHE = None
-FEATURE_NAMES = [
-    'gender', 'ap_hi', 'ap_lo', 'smoke', 'alco', 
-    'active', 'age_years', 'bmi', 'cholesterol_high', 'gluc_high'
-]
+# Caminho do modelo: ml/random_forest_pipeline.joblib (ou CARDIO_MODEL_PATH),
+# definido em inference_core.MODEL_PATH
+
+# Amostra de referência alternativa para as curvas (CSV com FEATURE_NAMES),
+# usada quando os metadados do modelo não trazem "background_sample"
+CURVES_BACKGROUND_CSV = os.getenv("CURVES_BACKGROUND_CSV")
+CURVES_BACKGROUND_SIZE = 500
+CURVES_BACKGROUND_CHUNK_ROWS = 50_000
+
+# Token dos endpoints administrativos (se não definido, eles ficam desativados)
+ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+
+# Modo sombra: modelo candidato avaliado em segundo plano sobre uma amostra do tráfego
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_QUEUE_ROWS = int(os.getenv("SHADOW_QUEUE_ROWS", "10000"))
+
+# Linhas mínimas para o monitor de drift calcular o PSI
+DRIFT_MIN_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "500"))
+
+# Estado derivado do modelo carregado (refeito a cada carregamento)
+CURVES_CACHE = CurveCache()
+SHADOW = None
+_SHADOW_START_LOCK = threading.Lock()
+DRIFT_MONITOR = DriftMonitor(None, [])
+
+# Categorias de risco (índice = código) + "erro" para linhas inválidas do lote
+BATCH_RISK_CATEGORIES = RISK_CATEGORIES + ("erro",)
+RISK_RECOMMENDATIONS = (
+    "Mantenha hábitos saudáveis e faça check-ups regulares.",
+    "Consulte um médico para avaliação. Considere mudanças no estilo de vida.",
+    "Procure um cardiologista urgentemente para avaliação detalhada."
+)
 
 def load_model():
-    """Carrega o modelo uma vez e mantém em cache."""
-    global MODEL_CACHE
+    """Modelo do núcleo de inferência (carregado uma única vez por processo)."""
+    return inference_core.load_model()
+
+
+def on_model_loaded(loaded: inference_core.LoadedModel):
+    """Chamado pelo núcleo a cada carregamento: monitor de drift e curvas."""
+    global DRIFT_MONITOR
     
-    if MODEL_CACHE is not None:
-        return MODEL_CACHE
+    DRIFT_MONITOR = DriftMonitor(loaded.metadata.get("reference_profile"), FEATURE_NAMES, DRIFT_MIN_ROWS)
     
-    # Caminho do modelo
-    model_path = Path(__file__).parent.parent / 'classification' / 'models' / 'random_forest_pipeline.joblib'
+    # Pré-calcula as curvas de dependência parcial em segundo plano (a amostra
+    # de referência também é lida lá, sem segurar o carregamento do modelo)
+    CURVES_CACHE.schedule(loaded.model, loaded.version,
+                          partial(load_background_sample, loaded.metadata), FEATURE_NAMES)
+
+
+def start_shadow_in_background():
+    """
+    Carrega o candidato em uma thread própria: nem a inicialização nem o
+    lock do modelo principal esperam pelo joblib.load do candidato.
+    """
+    threading.Thread(target=start_shadow, name='shadow-loader', daemon=True).start()
+
+
+def start_shadow():
+    """Carrega o modelo candidato (SHADOW_MODEL_PATH) e inicia a avaliação sombra."""
+    global SHADOW
     
-    if not model_path.exists():
-        raise FileNotFoundError(f"Modelo não encontrado: {model_path}")
+    with _SHADOW_START_LOCK:
+        if SHADOW is not None:
+            return
+        
+        logger.info(f"🕶️ Carregando modelo candidato de: {SHADOW_MODEL_PATH}")
+        try:
+            candidate = joblib.load(SHADOW_MODEL_PATH)
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar modelo candidato: {e}")
+            return
+        try:
+            # Um núcleo só, para não disputar CPU com o modelo principal
+            candidate.set_params(classifier__n_jobs=1)
+        except ValueError:
+            pass
+        
+        SHADOW = ShadowEvaluator(
+            candidate,
+            FEATURE_NAMES,
+            categorize=risk_category_codes,
+            categories=RISK_CATEGORIES,
+            sample_rate=SHADOW_SAMPLE_RATE,
+            max_pending_rows=SHADOW_QUEUE_ROWS,
+            label=str(SHADOW_MODEL_PATH)
+        )
+    logger.info(f"✅ Modo sombra ativo (amostra de {SHADOW_SAMPLE_RATE:.0%})")
+
+
+def reload_model():
+    """Carrega novamente do disco e troca o modelo (requisições em curso usam o anterior)."""
+    return inference_core.MODEL.reload().model
+
+
+def load_background_sample(metadata: dict) -> Optional[np.ndarray]:
+    """
+    Amostra de referência para as curvas: metadados do modelo ou CURVES_BACKGROUND_CSV.
+
+    O CSV é lido em blocos e cada linha recebe uma chave aleatória; ficam as
+    CURVES_BACKGROUND_SIZE menores chaves, então a memória não cresce com o arquivo.
+    """
+    if metadata.get("background_sample"):
+        return np.asarray(metadata["background_sample"], dtype=float)
     
-    logger.info(f"📦 Carregando modelo de: {model_path}")
-    MODEL_CACHE = joblib.load(model_path)
-    logger.info("✅ Modelo carregado com sucesso!")
+    if CURVES_BACKGROUND_CSV and Path(CURVES_BACKGROUND_CSV).exists():
+        rng = np.random.default_rng(42)
+        sample = None
+        for chunk in pd.read_csv(CURVES_BACKGROUND_CSV, usecols=FEATURE_NAMES,
+                                 chunksize=CURVES_BACKGROUND_CHUNK_ROWS):
+            chunk = chunk.assign(_key=rng.random(len(chunk)))
+            if sample is not None:
+                chunk = pd.concat([sample, chunk], ignore_index=True)
+            sample = chunk.nsmallest(CURVES_BACKGROUND_SIZE, "_key")
+        if sample is not None and len(sample):
+            return sample[FEATURE_NAMES].to_numpy(dtype=float)
     
-    return MODEL_CACHE
+    return None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependência dos endpoints administrativos (header X-Admin-Token)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token administrativo inválido")
+
+
+# Registrado depois das funções que usa: se o modelo já estiver carregado
+# (ex.: pelo ml_service no mesmo processo), o listener roda na hora
+inference_core.MODEL.add_listener(on_model_loaded)
 
 # Carregar modelo na inicialização
 @app.on_event("startup")
@@ -79,6 +203,8 @@ async def startup_event():
     """Carrega modelo quando o servidor inicia."""
     try:
         load_model()
+        if SHADOW_MODEL_PATH:
+            start_shadow_in_background()
         logger.info("🚀 Servidor pronto para predições!")
     except Exception as e:
         logger.error(f"❌ Erro ao carregar modelo: {e}")
@@ -189,7 +315,10 @@ async def root():
             "predict": "/predict",
             "predict_simple": "/predict/simple",
             "health": "/health",
-            "model_info": "/model/info"
+            "model_info": "/model/info",
+            "model_curves": "/model/curves",
+            "predict_batch": "/predict/batch",
+            "drift": "/monitoring/drift"
         }
     }
 
@@ -212,29 +341,150 @@ async def health_check():
 async def model_info():
     """Retorna informações sobre o modelo."""
     try:
-        model = load_model()
-        classifier = model.named_steps['classifier']
+        info = inference_core.model_info()
         
         # Feature importances
-        importances = classifier.feature_importances_
-        feature_importance = [
-            {"feature": name, "importance": float(imp), "percentage": float(imp * 100)}
-            for name, imp in sorted(zip(FEATURE_NAMES, importances), key=lambda x: x[1], reverse=True)
+        importances = info.pop("feature_importances")
+        info["feature_importance"] = [
+            {"feature": name, "importance": imp, "percentage": imp * 100}
+            for name, imp in sorted(importances.items(), key=lambda x: x[1], reverse=True)
         ]
-        
-        return {
-            "model_type": "RandomForestClassifier",
-            "n_estimators": classifier.n_estimators,
-            "max_depth": classifier.max_depth,
-            "n_features": classifier.n_features_in_,
-            "feature_names": FEATURE_NAMES,
-            "feature_importance": feature_importance,
-            "preprocessing": ["RobustScaler"]
-        }
+        return info
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter info: {str(e)}")
 
 
+@app.get("/model/curves")
+async def model_curves():
+    """
+    Curvas de risco médio da população por feature (dependência parcial).
+    
+    Calculadas quando o modelo é carregado; enquanto o cálculo não termina
+    o endpoint responde 503.
+    """
+    try:
+        version = inference_core.get_model_version()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Serviço indisponível: {str(e)}")
+    
+    curves = CURVES_CACHE.get(version)
+    if curves is not None:
+        return curves
+    
+    status = CURVES_CACHE.status(version)
+    if status["error"]:
+        raise HTTPException(status_code=503, detail=f"Curvas indisponíveis: {status['error']}")
+    raise HTTPException(
+        status_code=503,
+        detail="Curvas em cálculo, tente novamente em instantes",
+        headers={"Retry-After": "5"}
+    )
+
+
+@app.get("/monitoring/drift")
+async def monitoring_drift():
+    """
+    Drift das entradas recebidas em relação aos dados de treino.
+    
+    PSI por feature (histogramas de ap_hi, ap_lo, age_years, bmi e taxas das
+    features binárias) contra o perfil de referência dos metadados do modelo.
+    """
+    return DRIFT_MONITOR.report()
+
+
+@app.post("/monitoring/drift/reset", dependencies=[Depends(require_admin)])
+async def monitoring_drift_reset():
+    """Zera os contadores do monitor de drift e começa uma nova janela (administrativo)."""
+    DRIFT_MONITOR.reset()
+    return {"success": True, "since": DRIFT_MONITOR.since.isoformat()}
+
+
+@app.get("/shadow/report", dependencies=[Depends(require_admin)])
+async def shadow_report():
+    """Comparação do modelo candidato (modo sombra) com o principal (administrativo)."""
+    if SHADOW is None:
+        if SHADOW_MODEL_PATH:
+            raise HTTPException(status_code=503, detail="Modelo candidato ainda não carregado")
+        raise HTTPException(status_code=404, detail="Modo sombra desativado (defina SHADOW_MODEL_PATH)")
+    return SHADOW.report()
+
+
+@app.post("/model/reload", dependencies=[Depends(require_admin)])
+async def model_reload():
+    """Recarrega o modelo do disco (administrativo). As curvas são recalculadas."""
+    try:
+        loaded = inference_core.MODEL.reload()
+        return {"success": True, "model_version": loaded.version}
+    except Exception as e:
+        logger.error(f"Erro ao recarregar modelo: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao recarregar modelo: {str(e)}")
+
+
+def observe_traffic(X: np.ndarray, probability) -> None:
+    """
+    Registra linhas pontuadas de tráfego real: monitor de drift e cópia
+    (por amostragem) para o modelo sombra, sem esperar por ele.
+    
+    Chamado pelos handlers de predição, nunca por predict_patient: assim o
+    profiling de alocações e as verificações não contam como tráfego.
+    """
+    DRIFT_MONITOR.update(X)
+    if SHADOW is not None:
+        SHADOW.offer(X, probability)
+
+
+def score_patient(patient: PatientData) -> Tuple[np.ndarray, float, PredictionResponse]:
+    """
+    Pontua um paciente (síncrono), sem registrar tráfego.
+    
+    Returns:
+        Tupla (linha de features, probabilidade %, resposta)
+    """
+    # Preparar dados na ordem correta e fazer predição (núcleo compartilhado)
+    row = inference_core.to_matrix([patient.dict()])
+    probability, confidence, category = score_matrix(row)
+    probability, confidence, code = float(probability[0]), float(confidence[0]), int(category[0])
+    
+    # Classificar risco
+    risk_level = RISK_LEVELS[code]
+    risk_category = RISK_CATEGORIES[code]
+    recommendation = RISK_RECOMMENDATIONS[code]
+    
+    # Identificar principais fatores de risco
+    risk_factors = []
+    if patient.ap_hi > 140:
+        risk_factors.append("Pressão sistólica elevada")
+    if patient.bmi > 30:
+        risk_factors.append("Obesidade (IMC alto)")
+    if patient.age_years > 55:
+        risk_factors.append("Idade avançada")
+    if patient.cholesterol_high == 1:
+        risk_factors.append("Colesterol alto")
+    if patient.smoke == 1:
+        risk_factors.append("Tabagismo")
+    if patient.active == 0:
+        risk_factors.append("Sedentarismo")
+    
+    return row, probability, PredictionResponse(
+        success=True,
+        probability=round(probability, 2),
+        risk_level=risk_level,
+        risk_category=risk_category,
+        confidence=round(confidence, 2),
+        recommendation=recommendation,
+        top_risk_factors=risk_factors if risk_factors else ["Nenhum fator de risco identificado"]
+    )
+
+
+def predict_patient(patient: PatientData) -> PredictionResponse:
+    """
+    Executa a predição de um paciente (síncrono), sem registrar tráfego.
+    
+    Usado pelo profiling de alocações (/debug/tracemalloc) e pelas verificações.
+    """
+    return score_patient(patient)[2]
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(patient: PatientData):
     """
@@ -243,67 +493,9 @@ async def predict(patient: PatientData):
     Requer todos os 10 campos.
     """
     try:
-        # Carregar modelo
-        model = load_model()
-        
-        # Preparar dados na ordem correta
-        data = pd.DataFrame([{
-            'gender': patient.gender,
-            'ap_hi': patient.ap_hi,
-            'ap_lo': patient.ap_lo,
-            'smoke': patient.smoke,
-            'alco': patient.alco,
-            'active': patient.active,
-            'age_years': patient.age_years,
-            'bmi': patient.bmi,
-            'cholesterol_high': patient.cholesterol_high,
-            'gluc_high': patient.gluc_high
-        }])
-        
-        # Fazer predição
-        proba = model.predict_proba(data)[0]
-        probability = float(proba[1] * 100)  # Probabilidade de doença (classe 1)
-        confidence = float(max(proba) * 100)  # Confiança na predição
-        
-        # Classificar risco
-        if probability < 30:
-            risk_level = "baixo"
-            risk_category = "sem_risco"
-            recommendation = "Mantenha hábitos saudáveis e faça check-ups regulares."
-        elif probability < 60:
-            risk_level = "médio"
-            risk_category = "risco_moderado"
-            recommendation = "Consulte um médico para avaliação. Considere mudanças no estilo de vida."
-        else:
-            risk_level = "alto"
-            risk_category = "alto_risco"
-            recommendation = "Procure um cardiologista urgentemente para avaliação detalhada."
-        
-        # Identificar principais fatores de risco
-        risk_factors = []
-        if patient.ap_hi > 140:
-            risk_factors.append("Pressão sistólica elevada")
-        if patient.bmi > 30:
-            risk_factors.append("Obesidade (IMC alto)")
-        if patient.age_years > 55:
-            risk_factors.append("Idade avançada")
-        if patient.cholesterol_high == 1:
-            risk_factors.append("Colesterol alto")
-        if patient.smoke == 1:
-            risk_factors.append("Tabagismo")
-        if patient.active == 0:
-            risk_factors.append("Sedentarismo")
-        
-        return PredictionResponse(
-            success=True,
-            probability=round(probability, 2),
-            risk_level=risk_level,
-            risk_category=risk_category,
-            confidence=round(confidence, 2),
-            recommendation=recommendation,
-            top_risk_factors=risk_factors if risk_factors else ["Nenhum fator de risco identificado"]
-        )
-        
+        row, probability, response = score_patient(patient)
+        observe_traffic(row, [probability])
+        return response
     except Exception as e:
         logger.error(f"Erro na predição: {e}")
         raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
@@ -344,6 +536,115 @@ async def predict_simple(patient: SimplifiedPatientData):
         raise HTTPException(status_code=500, detail=f"Erro: {str(e)}")
 
 
+def predict_columns(X: np.ndarray) -> dict:
+    """
+    Valida e pontua um lote colunar. Linhas inválidas recebem NaN e a
+    categoria "erro".
+    """
+    valid = inference_core.valid_rows(X, strict_integers=True)
+    
+    probability = np.full(len(X), np.nan)
+    confidence = np.full(len(X), np.nan)
+    category = np.full(len(X), BATCH_RISK_CATEGORIES.index("erro"), dtype=np.uint8)
+    if valid.any():
+        probability[valid], confidence[valid], category[valid] = score_matrix(X[valid])
+        observe_traffic(X[valid], probability[valid])
+    
+    return {
+        "probability": np.round(probability, 2),
+        "confidence": np.round(confidence, 2),
+        "risk_category": category,
+        "valid": valid.astype(np.uint8)
+    }
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Predição em lote com payload binário colunar (MessagePack ou Arrow IPC).
+    
+    Cada coluna de FEATURE_NAMES é decodificada direto em arrays NumPy,
+    sem validação Pydantic por paciente. A resposta volta no mesmo formato,
+    com as colunas probability, confidence, risk_category e valid.
+    Ver binary_protocol.py para o formato.
+    """
+    content_type = request.headers.get("content-type", "")
+    kind = binary_protocol.media_type(content_type)
+    if kind not in binary_protocol.MSGPACK_CONTENT_TYPES and kind != binary_protocol.ARROW_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type não suportado: {content_type}")
+    
+    body = await request.body()
+    try:
+        X = binary_protocol.decode(body, content_type, FEATURE_NAMES)
+        # profiled: com X-Debug-Profile, o cProfile também vê a thread do pool
+        columns = await run_in_threadpool(profiling.profiled, predict_columns, X)
+        content, media_type = binary_protocol.encode(columns, BATCH_RISK_CATEGORIES, content_type)
+    except binary_protocol.PayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Formato indisponível no servidor: {str(e)}")
+    except Exception as e:
+        logger.error(f"Erro na predição em lote: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro na predição em lote: {str(e)}")
+    
+    return Response(content=content, media_type=media_type)
+
+
+# ==================== PROFILING (DEBUG) ====================
+
+# Endpoints e middleware de profiling só são registrados com API_DEBUG_PROFILING=1
+# (e ainda exigem o token administrativo). Desligado, nada disso existe no app.
+DEBUG_PROFILING = os.getenv("API_DEBUG_PROFILING") == "1"
+
+if DEBUG_PROFILING:
+    from fastapi import Query
+    from fastapi.responses import PlainTextResponse
+    
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        """
+        Perfil cProfile de requisições com o header X-Debug-Profile: 1.
+        
+        O resumo vai no header X-Profile-Summary e completo no log. O
+        profiler observa a thread do event loop (outras requisições
+        simultâneas podem aparecer) e o trabalho enviado ao thread pool
+        com profiling.profiled. Um perfil por vez: com outro em andamento,
+        a requisição é servida sem profiling e com o header X-Profile-Skipped.
+        """
+        if (request.headers.get("x-debug-profile") != "1"
+                or not ADMIN_TOKEN or request.headers.get("x-admin-token") != ADMIN_TOKEN):
+            return await call_next(request)
+        
+        with profiling.RequestProfile() as request_profile:
+            response = await call_next(request)
+        
+        if not request_profile.active:
+            response.headers["X-Profile-Skipped"] = "outro perfil em andamento"
+            return response
+        
+        summary = profiling.summarize_profile(request_profile.profilers)
+        logger.info(f"🔬 Perfil de {request.url.path}: {json.dumps(summary, ensure_ascii=False)}")
+        response.headers["X-Profile-Summary"] = profiling.format_profile_header(summary)
+        return response
+    
+    @app.get("/debug/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+    async def debug_profile(seconds: float = Query(10, gt=0, le=profiling.MAX_PROFILE_SECONDS)):
+        """
+        Amostra as pilhas do worker por N segundos (administrativo).
+        
+        Retorna collapsed stacks, prontas para flamegraph.pl ou speedscope.
+        """
+        return await run_in_threadpool(profiling.sample_stacks, seconds)
+    
+    @app.post("/debug/tracemalloc", dependencies=[Depends(require_admin)])
+    async def debug_tracemalloc(iterations: int = Query(100, ge=1, le=10_000)):
+        """Snapshot de alocações do caminho de predição com o paciente de exemplo (administrativo)."""
+        patient = PatientData(**PatientData.Config.schema_extra["example"])
+        return await run_in_threadpool(
+            profiling.capture_allocations, lambda: predict_patient(patient), iterations
+        )
+
+
 # ==================== EXECUTAR SERVIDOR ====================
 
 if __name__ == "__main__":
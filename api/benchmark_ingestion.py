@@ -0,0 +1,129 @@
+"""
+⏱️ Benchmark - Ingestão JSON × MessagePack × Arrow
+
+Compara, para lotes de 10 mil e 100 mil pacientes, o tempo de:
+- decodificação (JSON + Pydantic por paciente × payload colunar binário)
+- pontuação do lote decodificado
+
+Uso:
+    python benchmark_ingestion.py
+    python benchmark_ingestion.py --model ../ml/random_forest_pipeline.joblib --sizes 10000 100000
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+
+import api_server
+import binary_protocol
+import inference_core  # ml/ entra no sys.path via api_server
+from api_server import FEATURE_NAMES, PatientData
+
+
+def make_columns(n: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    """Gera colunas sintéticas válidas."""
+    rng = np.random.default_rng(seed)
+    ap_hi = rng.integers(95, 200, n)
+    return {
+        'gender': rng.integers(0, 2, n),
+        'ap_hi': ap_hi,
+        'ap_lo': np.minimum(rng.integers(60, 120, n), ap_hi - 10),
+        'smoke': rng.integers(0, 2, n),
+        'alco': rng.integers(0, 2, n),
+        'active': rng.integers(0, 2, n),
+        'age_years': rng.integers(25, 85, n),
+        'bmi': np.round(rng.uniform(18.0, 42.0, n), 1),
+        'cholesterol_high': rng.integers(0, 2, n),
+        'gluc_high': rng.integers(0, 2, n)
+    }
+
+
+def json_payload(columns: Dict[str, np.ndarray]) -> bytes:
+    n = len(columns['gender'])
+    rows = [{name: columns[name][i].item() for name in FEATURE_NAMES} for i in range(n)]
+    return json.dumps(rows).encode()
+
+
+def msgpack_payload(columns: Dict[str, np.ndarray]) -> bytes:
+    payload = {name: values.astype('<f8').tobytes() for name, values in columns.items()}
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def arrow_payload(columns: Dict[str, np.ndarray]) -> bytes:
+    batch = pa.RecordBatch.from_pydict({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_json(body: bytes) -> np.ndarray:
+    """Caminho atual: JSON → PatientData por paciente → matriz."""
+    patients = [PatientData(**row) for row in json.loads(body)]
+    return np.array([[getattr(p, name) for name in FEATURE_NAMES] for p in patients], dtype=float)
+
+
+def timed(func: Callable[[], object], repeat: int = 3):
+    """Melhor tempo de `repeat` execuções (segundos) e o último resultado."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(sizes: List[int]) -> List[Dict[str, object]]:
+    api_server.load_model()
+    results = []
+
+    for n in sizes:
+        columns = make_columns(n)
+        formats = {
+            "json": (json_payload(columns), decode_json),
+            "msgpack": (msgpack_payload(columns),
+                        lambda body: binary_protocol.decode(body, "application/msgpack", FEATURE_NAMES)),
+            "arrow": (arrow_payload(columns),
+                      lambda body: binary_protocol.decode(body, binary_protocol.ARROW_CONTENT_TYPE, FEATURE_NAMES)),
+        }
+
+        for name, (body, decoder) in formats.items():
+            decode_seconds, X = timed(lambda: decoder(body))
+            score_seconds, _ = timed(lambda: api_server.predict_columns(X), repeat=1)
+            results.append({
+                "rows": n,
+                "format": name,
+                "payload_mb": len(body) / 1e6,
+                "decode_ms": decode_seconds * 1000,
+                "score_ms": score_seconds * 1000
+            })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de ingestão JSON × MessagePack × Arrow")
+    parser.add_argument('--model', type=Path, help="Caminho do .joblib")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000], help="Tamanhos de lote")
+    args = parser.parse_args()
+
+    if args.model:
+        inference_core.MODEL.path = args.model
+
+    print("=" * 70)
+    print("⏱️ BENCHMARK DE INGESTÃO (JSON × MessagePack × Arrow)")
+    print("=" * 70)
+
+    results = run_benchmark(args.sizes)
+
+    print(f"\n{'linhas':>8}  {'formato':<9}{'payload MB':>12}{'decode ms':>12}{'score ms':>12}")
+    for r in results:
+        print(f"{r['rows']:>8}  {r['format']:<9}{r['payload_mb']:>12.2f}"
+              f"{r['decode_ms']:>12.1f}{r['score_ms']:>12.1f}")
+    print("\n" + "=" * 70)
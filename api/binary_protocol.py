@@ -0,0 +1,187 @@
+"""
+📦 Protocolo binário colunar para predição em alto volume
+
+Alternativa ao JSON para parceiros que enviam muitos pacientes por vez.
+O payload é colunar (uma coluna por feature de FEATURE_NAMES) e vira
+direto arrays NumPy, sem criar um objeto Python por paciente.
+
+Formatos aceitos (header Content-Type):
+
+- application/msgpack
+    Mapa {feature: bytes} com os valores da coluna em binário
+    little-endian (float64 por padrão). Tipos menores podem ser
+    declarados em "dtypes", ex.: {"dtypes": {"gender": "<i1"}}.
+    Listas de números também são aceitas, mas são mais lentas.
+
+- application/vnd.apache.arrow.stream
+    Stream Arrow IPC com uma ou mais record batches contendo as colunas.
+
+Cada coluna deve ser 1-D e numérica; qualquer payload fora disso vira
+PayloadError (HTTP 400). A resposta usa o mesmo formato da requisição. A validação das linhas fica
+no núcleo de inferência (ml/inference_core.py).
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+# Tipos aceitos para colunas binárias no MessagePack
+ALLOWED_DTYPES = {"<f8", "<f4", "<i8", "<i4", "<i2", "<i1", "|i1", "|u1", "<u1"}
+
+
+class PayloadError(ValueError):
+    """Payload binário malformado (vira HTTP 400)."""
+
+
+def media_type(content_type: str) -> str:
+    """Normaliza o Content-Type (sem parâmetros, minúsculo)."""
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+# ==================== DECODIFICAÇÃO ====================
+
+def decode_msgpack(body: bytes, feature_names: List[str]) -> np.ndarray:
+    """Decodifica um payload MessagePack colunar na matriz (n × features)."""
+    import msgpack
+
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise PayloadError(f"MessagePack inválido: {e}")
+    if not isinstance(payload, dict):
+        raise PayloadError("O payload deve ser um mapa {feature: coluna}")
+
+    dtypes = payload.get("dtypes") or {}
+    if not isinstance(dtypes, dict):
+        raise PayloadError('"dtypes" deve ser um mapa {feature: tipo}')
+
+    columns = []
+    for name in feature_names:
+        if name not in payload:
+            raise PayloadError(f"Coluna ausente: {name}")
+        column = payload[name]
+
+        if isinstance(column, (bytes, bytearray)):
+            dtype = dtypes.get(name, "<f8")
+            if not isinstance(dtype, str) or dtype not in ALLOWED_DTYPES:
+                raise PayloadError(f"Tipo não suportado para {name}: {dtype}")
+            if len(column) % np.dtype(dtype).itemsize:
+                raise PayloadError(f"Tamanho da coluna {name} incompatível com {dtype}")
+            columns.append(_numeric_column(name, np.frombuffer(column, dtype=dtype)))
+        elif isinstance(column, list):
+            try:
+                values = np.asarray(column, dtype=float)
+            except (TypeError, ValueError):
+                raise PayloadError(f"Coluna {name} deve conter apenas números")
+            columns.append(_numeric_column(name, values))
+        else:
+            raise PayloadError(f"Coluna {name} deve ser bytes ou lista")
+
+    return _stack_columns(columns)
+
+
+def decode_arrow(body: bytes, feature_names: List[str]) -> np.ndarray:
+    """Decodifica um stream Arrow IPC na matriz (n × features)."""
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except Exception as e:
+        raise PayloadError(f"Stream Arrow inválido: {e}")
+
+    missing = [name for name in feature_names if name not in table.column_names]
+    if missing:
+        raise PayloadError(f"Colunas ausentes: {', '.join(missing)}")
+
+    columns = []
+    for name in feature_names:
+        column = table.column(name)
+        if column.null_count:
+            raise PayloadError(f"Coluna {name} contém valores nulos")
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            raise PayloadError(f"Coluna {name} deve ser numérica (recebido {column.type})")
+        try:
+            values = column.to_numpy()
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            raise PayloadError(f"Coluna {name} não pôde ser convertida: {e}")
+        columns.append(_numeric_column(name, values))
+
+    return _stack_columns(columns)
+
+
+def _numeric_column(name: str, values: np.ndarray) -> np.ndarray:
+    """Garante uma coluna 1-D de números (inteiros ou reais)."""
+    if values.ndim != 1:
+        raise PayloadError(f"Coluna {name} deve ser uma lista simples de números")
+    if values.dtype.kind not in "iuf":
+        raise PayloadError(f"Coluna {name} deve ser numérica (recebido {values.dtype})")
+    return values
+
+
+def _stack_columns(columns: List[np.ndarray]) -> np.ndarray:
+    if len({len(c) for c in columns}) != 1:
+        raise PayloadError("Todas as colunas devem ter o mesmo tamanho")
+    X = np.empty((len(columns[0]), len(columns)), dtype=float)
+    for j, column in enumerate(columns):
+        X[:, j] = column
+    return X
+
+
+def decode(body: bytes, content_type: str, feature_names: List[str]) -> np.ndarray:
+    """Decodifica o corpo conforme o Content-Type."""
+    kind = media_type(content_type)
+    if kind in MSGPACK_CONTENT_TYPES:
+        return decode_msgpack(body, feature_names)
+    if kind == ARROW_CONTENT_TYPE:
+        return decode_arrow(body, feature_names)
+    raise PayloadError(f"Content-Type não suportado: {content_type}")
+
+
+# ==================== CODIFICAÇÃO DA RESPOSTA ====================
+
+def encode_msgpack(columns: Dict[str, np.ndarray], categories: Tuple[str, ...]) -> bytes:
+    """
+    Codifica a resposta em MessagePack colunar.
+
+    Cada coluna vai como bytes little-endian, com o tipo em "dtypes";
+    "risk_category" traz códigos que indexam a lista "categories".
+    """
+    import msgpack
+
+    payload = {name: np.ascontiguousarray(values).tobytes() for name, values in columns.items()}
+    payload["dtypes"] = {name: values.dtype.str for name, values in columns.items()}
+    payload["categories"] = list(categories)
+    payload["n_rows"] = len(next(iter(columns.values())))
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def encode_arrow(columns: Dict[str, np.ndarray], categories: Tuple[str, ...]) -> bytes:
+    """
+    Codifica a resposta como stream Arrow IPC.
+
+    "risk_category" vira uma coluna dictionary (códigos + categorias).
+    """
+    import pyarrow as pa
+
+    arrays = {}
+    for name, values in columns.items():
+        if name == "risk_category":
+            arrays[name] = pa.DictionaryArray.from_arrays(pa.array(values), pa.array(list(categories)))
+        else:
+            arrays[name] = pa.array(values)
+    batch = pa.RecordBatch.from_pydict(arrays)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(columns: Dict[str, np.ndarray], categories: Tuple[str, ...], content_type: str) -> Tuple[bytes, str]:
+    """Codifica a resposta no mesmo formato da requisição."""
+    if media_type(content_type) == ARROW_CONTENT_TYPE:
+        return encode_arrow(columns, categories), ARROW_CONTENT_TYPE
+    return encode_msgpack(columns, categories), MSGPACK_CONTENT_TYPES[0]
@@ -0,0 +1,174 @@
+"""
+📉 Monitor de drift das entradas (memória constante)
+
+Acumula, a cada linha pontuada, resumos de tamanho fixo das features:
+- histogramas com as faixas do perfil de referência para ap_hi, ap_lo,
+  age_years e bmi
+- contadores de 1s para as features binárias
+
+e compara com o perfil de referência gravado nos metadados do modelo
+(ml/train_model.py) usando PSI (Population Stability Index).
+
+A memória não cresce com o tráfego: só contadores por faixa. As
+atualizações são vetorizadas, então um lote custa o mesmo que uma linha
+em número de operações Python.
+
+Com poucas linhas o PSI não tem significado (uma única linha já dá PSI
+alto), então o relatório só compara a partir de MIN_ROWS. reset() zera os
+contadores para começar uma nova janela de observação (ex.: após uma
+mudança conhecida no tráfego).
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import threading
+
+import numpy as np
+
+# Fração mínima por faixa no PSI (evita log(0) em faixas vazias)
+PSI_EPSILON = 1e-4
+
+# Interpretação usual do PSI
+PSI_STABLE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Linhas mínimas na janela para calcular o PSI
+MIN_ROWS = 500
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index entre duas distribuições (frações por faixa)."""
+    expected = np.clip(np.asarray(expected, dtype=float), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=float), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def psi_status(value: float) -> str:
+    if value < PSI_STABLE:
+        return "estável"
+    if value < PSI_SIGNIFICANT:
+        return "moderado"
+    return "significativo"
+
+
+class DriftMonitor:
+    """
+    Resumos de streaming das entradas comparados ao perfil de referência.
+
+    Args:
+        profile: "reference_profile" dos metadados do modelo (ou None)
+        feature_names: Ordem das colunas das matrizes recebidas em update()
+        min_rows: Linhas mínimas para o relatório calcular o PSI
+    """
+
+    def __init__(self, profile: Optional[Dict[str, Any]], feature_names: List[str],
+                 min_rows: int = MIN_ROWS):
+        self.profile = profile
+        self.min_rows = min_rows
+        self._lock = threading.Lock()
+        self.n_rows = 0
+        self.since = datetime.now(timezone.utc)
+
+        continuous = (profile or {}).get("continuous", {})
+        binary = (profile or {}).get("binary", {})
+
+        # (nome, coluna, limites, contagens por faixa)
+        self._histograms = [
+            (name, feature_names.index(name), np.asarray(spec["edges"], dtype=float),
+             np.zeros(len(spec["edges"]) + 1, dtype=np.int64))
+            for name, spec in continuous.items()
+        ]
+        self._binary_names = list(binary)
+        self._binary_columns = [feature_names.index(name) for name in self._binary_names]
+        self._binary_ones = np.zeros(len(self._binary_names), dtype=np.int64)
+
+    @property
+    def enabled(self) -> bool:
+        return self.profile is not None
+
+    def update(self, X: np.ndarray) -> None:
+        """Adiciona linhas pontuadas (n × features) aos resumos."""
+        if not self.enabled or len(X) == 0:
+            return
+
+        # Contagens calculadas fora do lock; dentro dele só somas de arrays pequenos
+        bin_counts = [
+            np.bincount(np.searchsorted(edges, X[:, column], side='right'), minlength=len(counts))
+            for _, column, edges, counts in self._histograms
+        ]
+        ones = (X[:, self._binary_columns] == 1).sum(axis=0)
+
+        with self._lock:
+            self.n_rows += len(X)
+            for (_, _, _, counts), new_counts in zip(self._histograms, bin_counts):
+                counts += new_counts
+            self._binary_ones += ones
+
+    def reset(self) -> None:
+        """Zera os contadores e começa uma nova janela de observação."""
+        with self._lock:
+            self.n_rows = 0
+            for _, _, _, counts in self._histograms:
+                counts[:] = 0
+            self._binary_ones[:] = 0
+            self.since = datetime.now(timezone.utc)
+
+    def report(self) -> Dict[str, Any]:
+        """Drift por feature (PSI) em relação ao perfil de referência."""
+        if not self.enabled:
+            return {"enabled": False, "detail": "Modelo sem perfil de referência (gere com ml/train_model.py)"}
+
+        with self._lock:
+            n_rows = self.n_rows
+            since = self.since
+            histograms = [(name, edges, counts.copy()) for name, _, edges, counts in self._histograms]
+            binary_ones = self._binary_ones.copy()
+
+        summary = {
+            "enabled": True,
+            "since": since.isoformat(),
+            "rows_observed": n_rows,
+            "min_rows": self.min_rows,
+            "reference_rows": self.profile.get("n_samples"),
+        }
+        if n_rows < self.min_rows:
+            return {
+                **summary,
+                "max_psi": None,
+                "status": "dados_insuficientes",
+                "detail": f"São necessárias ao menos {self.min_rows} linhas para calcular o PSI",
+                "features": {}
+            }
+
+        features = {}
+        if n_rows:
+            for name, edges, counts in histograms:
+                expected = self.profile["continuous"][name]["fractions"]
+                actual = counts / n_rows
+                value = psi(expected, actual)
+                features[name] = {
+                    "psi": round(value, 4),
+                    "status": psi_status(value),
+                    "edges": edges.tolist(),
+                    "expected": expected,
+                    "actual": np.round(actual, 4).tolist()
+                }
+
+            for name, ones in zip(self._binary_names, binary_ones.tolist()):
+                expected_rate = self.profile["binary"][name]
+                actual_rate = ones / n_rows
+                value = psi([1 - expected_rate, expected_rate], [1 - actual_rate, actual_rate])
+                features[name] = {
+                    "psi": round(value, 4),
+                    "status": psi_status(value),
+                    "expected_rate": round(expected_rate, 4),
+                    "actual_rate": round(actual_rate, 4)
+                }
+
+        max_psi = max((f["psi"] for f in features.values()), default=None)
+        return {
+            **summary,
+            "max_psi": max_psi,
+            "status": psi_status(max_psi) if max_psi is not None else None,
+            "features": features
+        }
@@ -0,0 +1,192 @@
+"""
+📈 Curvas de dependência parcial (risco × feature)
+
+Pré-calcula, para cada feature do modelo, a curva de risco médio da
+população quando a feature varia e as demais ficam como na amostra de
+referência (ex.: risco × pressão sistólica, risco × IMC).
+
+O cálculo é vetorizado (uma única chamada a predict_proba por feature,
+grade × amostra) e as features são processadas em paralelo. O resultado
+fica em cache por versão do modelo e é refeito quando o modelo é trocado.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Pontos da grade para features contínuas
+GRID_POINTS = 20
+
+# Quantis da amostra que delimitam a grade (evita caudas raras)
+GRID_QUANTILES = (0.05, 0.95)
+
+# Features cuja grade é arredondada para valores inteiros (não confundir com
+# inference_core.INTEGER_FEATURES, que lista as features inteiras da entrada)
+ROUNDED_GRID_FEATURES = {'ap_hi', 'ap_lo', 'age_years'}
+
+
+def feature_grid(values: np.ndarray, feature: str, grid_points: int = GRID_POINTS) -> np.ndarray:
+    """
+    Monta a grade de valores de uma feature a partir da amostra.
+
+    Features binárias usam [0, 1]; contínuas usam pontos igualmente
+    espaçados entre os quantis GRID_QUANTILES.
+    """
+    unique = np.unique(values)
+    if len(unique) <= 2:
+        return unique.astype(float)
+
+    low, high = np.quantile(values, GRID_QUANTILES)
+    grid = np.linspace(low, high, grid_points)
+    if feature in ROUNDED_GRID_FEATURES:
+        grid = np.unique(np.round(grid))
+    return grid
+
+
+def partial_dependence(model, background: np.ndarray, feature_names: List[str],
+                       feature_index: int, grid_points: int = GRID_POINTS) -> Dict[str, Any]:
+    """
+    Curva de dependência parcial de uma feature.
+
+    Replica a amostra uma vez por ponto da grade, substitui a coluna da
+    feature e pontua tudo numa única chamada ao modelo.
+
+    Args:
+        model: Pipeline treinado
+        background: Amostra de referência (n_amostras × n_features)
+        feature_names: Ordem das colunas
+        feature_index: Coluna da feature analisada
+        grid_points: Pontos da grade para features contínuas
+
+    Returns:
+        Dicionário com grade, risco médio (%) e faixa p10-p90 (%)
+    """
+    feature = feature_names[feature_index]
+    grid = feature_grid(background[:, feature_index], feature, grid_points)
+    n_samples = len(background)
+
+    X = np.tile(background, (len(grid), 1))
+    X[:, feature_index] = np.repeat(grid, n_samples)
+
+    proba = model.predict_proba(pd.DataFrame(X, columns=feature_names))[:, 1]
+    proba = proba.reshape(len(grid), n_samples) * 100
+
+    return {
+        "feature": feature,
+        "grid": grid.tolist(),
+        "mean_risk": np.round(proba.mean(axis=1), 2).tolist(),
+        "p10_risk": np.round(np.percentile(proba, 10, axis=1), 2).tolist(),
+        "p90_risk": np.round(np.percentile(proba, 90, axis=1), 2).tolist()
+    }
+
+
+def compute_curves(model, background: np.ndarray, feature_names: List[str],
+                   grid_points: int = GRID_POINTS,
+                   max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula as curvas de todas as features em paralelo.
+
+    Returns:
+        Dicionário {feature: curva}
+    """
+    background = np.asarray(background, dtype=float)
+    max_workers = max_workers or min(len(feature_names), os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pd-curve') as executor:
+        curves = executor.map(
+            lambda i: partial_dependence(model, background, feature_names, i, grid_points),
+            range(len(feature_names))
+        )
+        return {curve["feature"]: curve for curve in curves}
+
+
+class CurveCache:
+    """
+    Cache das curvas, chaveado pela versão do modelo.
+
+    schedule() dispara o cálculo em segundo plano; get() devolve as curvas
+    somente se forem da versão pedida. Trocar de modelo invalida o cache
+    e agenda o recálculo. A amostra de referência também é obtida no
+    executor, para não atrasar quem carrega o modelo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='curves')
+        self._version = None
+        self._curves = None
+        self._error = None
+        self._pending = False
+
+    def schedule(self, model, version: str, load_background: Callable[[], Optional[np.ndarray]],
+                 feature_names: List[str]) -> None:
+        """
+        Agenda o cálculo das curvas para a versão do modelo (se ainda não feito).
+
+        load_background é chamado no executor e devolve a amostra de
+        referência, ou None se o modelo não tiver uma.
+        """
+        with self._lock:
+            if version == self._version and (self._pending or self._curves is not None):
+                return
+            self._version = version
+            self._curves = None
+            self._error = None
+            self._pending = True
+            self._executor.submit(self._build, model, version, load_background, feature_names)
+
+    def _build(self, model, version: str, load_background: Callable[[], Optional[np.ndarray]],
+               feature_names: List[str]) -> None:
+        start = time.perf_counter()
+        background = None
+        try:
+            background = load_background()
+            if background is None:
+                curves, error = None, "Amostra de referência indisponível para este modelo"
+            else:
+                curves = compute_curves(model, background, feature_names)
+                error = None
+        except Exception as e:
+            logger.error(f"❌ Erro ao calcular curvas: {e}")
+            curves, error = None, str(e)
+
+        with self._lock:
+            # Outro modelo pode ter sido carregado durante o cálculo
+            if version != self._version:
+                return
+            self._pending = False
+            self._error = error
+            if curves is not None:
+                self._curves = {
+                    "model_version": version,
+                    "background_size": len(background),
+                    "computed_in_seconds": round(time.perf_counter() - start, 3),
+                    "curves": curves
+                }
+                logger.info(f"📈 Curvas calculadas em {self._curves['computed_in_seconds']}s")
+
+    def get(self, version: str) -> Optional[Dict[str, Any]]:
+        """Curvas da versão pedida, ou None se não estiverem prontas."""
+        with self._lock:
+            if version != self._version:
+                return None
+            return self._curves
+
+    def status(self, version: str) -> Dict[str, Any]:
+        """Estado do cálculo para a versão pedida."""
+        with self._lock:
+            if version != self._version:
+                return {"ready": False, "pending": False, "error": None}
+            return {
+                "ready": self._curves is not None,
+                "pending": self._pending,
+                "error": self._error
+            }
@@ -0,0 +1,244 @@
+"""
+🔬 Ferramentas de profiling para o servidor em produção
+
+- Amostrador estatístico de pilhas (baixo overhead) com saída no formato
+  "collapsed stacks", pronta para flamegraph.pl / speedscope
+- Resumo cProfile de uma única requisição (thread do event loop + trabalho
+  enviado ao thread pool com profiled())
+- Snapshot de alocações (tracemalloc) de uma função
+
+Nada aqui roda a menos que seja chamado explicitamente: o servidor só
+registra os endpoints e o middleware quando API_DEBUG_PROFILING=1.
+"""
+
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# Limites para evitar que um pedido de profiling prenda o worker
+MAX_PROFILE_SECONDS = 60
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Código da aplicação (api/ e ml/): o resto é asyncio, starlette, sklearn...
+APP_DIRS = tuple(str(path) for path in (
+    Path(__file__).resolve().parent,
+    Path(__file__).resolve().parent.parent / 'ml'
+))
+
+# Perfis da requisição em profiling, visíveis nas threads do pool
+# (run_in_threadpool copia o contexto para a thread)
+_REQUEST_PROFILERS: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar(
+    'request_profilers', default=None
+)
+
+# Uma RequestProfile por vez: requisições simultâneas dividem a thread do
+# event loop, e um segundo cProfile trocaria o hook do primeiro (3.11) ou
+# falharia com ValueError (3.12+)
+_REQUEST_PROFILE_LOCK = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(seconds: float, interval: float = DEFAULT_SAMPLE_INTERVAL) -> str:
+    """
+    Amostra as pilhas de todas as threads do processo por alguns segundos.
+
+    A cada intervalo lê sys._current_frames() (sem instrumentar o código),
+    então o custo para as requisições em andamento é mínimo.
+
+    Args:
+        seconds: Duração da amostragem
+        interval: Intervalo entre amostras (segundos)
+
+    Returns:
+        Texto no formato collapsed stacks ("thread;f1;f2;f3 N" por linha)
+    """
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    own_thread = threading.get_ident()
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            counts[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+
+    return '\n'.join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+class RequestProfile:
+    """
+    cProfile de uma requisição.
+
+    Perfila a thread que entra no bloco (o event loop) e recolhe os perfis
+    das chamadas feitas com profiled() nas threads do pool durante o bloco.
+
+    Se outro perfil já estiver em andamento, o bloco roda sem profiling e
+    active fica False (nunca bloqueia nem falha a requisição).
+    """
+
+    def __init__(self):
+        self.profilers = [cProfile.Profile()]
+        self.active = False
+
+    def __enter__(self) -> 'RequestProfile':
+        if not _REQUEST_PROFILE_LOCK.acquire(blocking=False):
+            return self
+        try:
+            self.profilers[0].enable()
+        except ValueError:
+            # Python 3.12+: outro profiler (fora de RequestProfile) já está ativo
+            _REQUEST_PROFILE_LOCK.release()
+            return self
+        self.active = True
+        self._token = _REQUEST_PROFILERS.set(self.profilers)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.active:
+            return
+        self.profilers[0].disable()
+        _REQUEST_PROFILERS.reset(self._token)
+        _REQUEST_PROFILE_LOCK.release()
+
+
+def profiled(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Executa func(*args); dentro de uma RequestProfile, sob um cProfile
+    próprio desta thread (o do event loop não enxerga o thread pool).
+    """
+    profilers = _REQUEST_PROFILERS.get()
+    if profilers is None:
+        return func(*args)
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+: só um profiler por processo, e o da requisição já vê todas as threads
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+def _is_app_code(filename: str) -> bool:
+    return filename.startswith(APP_DIRS)
+
+
+def summarize_profile(profilers: List[cProfile.Profile], limit: int = 15) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Resumo de um ou mais cProfiles (somados).
+
+    Returns:
+        "app": funções de api/ e ml/ por tempo acumulado (onde a requisição
+        passou); "self_time": qualquer função por tempo próprio (onde o
+        tempo foi gasto de fato, ex.: predict_proba)
+    """
+    stats = pstats.Stats(profilers[0], stream=io.StringIO())
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+
+    def entry(key):
+        filename, line, name = key
+        calls, _, total_time, cumulative_time, _ = stats.stats[key]
+        return {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total_time * 1000, 3),
+            "cumulative_ms": round(cumulative_time * 1000, 3)
+        }
+
+    keys = list(stats.stats)
+    app = sorted((k for k in keys if _is_app_code(k[0])), key=lambda k: stats.stats[k][3], reverse=True)
+    self_time = sorted(keys, key=lambda k: stats.stats[k][2], reverse=True)
+    return {
+        "app": [entry(k) for k in app[:limit]],
+        "self_time": [entry(k) for k in self_time[:limit]]
+    }
+
+
+def format_profile_header(summary: Dict[str, List[Dict[str, Any]]], limit: int = 5) -> str:
+    """Versão compacta do resumo para caber num header HTTP."""
+    def short(entry, key):
+        return f"{entry['function'].rsplit('/', 1)[-1]}={entry[key]}ms"
+
+    app = ', '.join(short(entry, 'cumulative_ms') for entry in summary["app"][:limit])
+    self_time = ', '.join(short(entry, 'total_ms') for entry in summary["self_time"][:limit])
+    return f"app(cum): {app} | self: {self_time}"
+
+
+def capture_allocations(func: Callable[[], Any], iterations: int = 100,
+                        limit: int = 20) -> Dict[str, Any]:
+    """
+    Mede as alocações de func com tracemalloc.
+
+    O tracemalloc só fica ligado durante a captura (se já estava ligado
+    por outro motivo, é mantido ligado ao final).
+
+    Args:
+        func: Função medida (sem argumentos)
+        iterations: Quantas vezes func é executada
+        limit: Linhas de código listadas
+
+    Returns:
+        Dicionário com pico de memória, memória retida por chamada e top linhas
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    retained = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+
+    return {
+        "iterations": iterations,
+        "seconds_per_call": elapsed / iterations,
+        "peak_bytes": peak - baseline,
+        "retained_bytes_per_call": retained / iterations,
+        "top_lines": [
+            {
+                "location": str(stat.traceback),
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff
+            }
+            for stat in diff[:limit]
+        ]
+    }
@@ -0,0 +1,194 @@
+"""
+🕶️ Avaliação sombra de um modelo candidato
+
+Uma amostra das linhas recebidas em /predict (cada linha de um lote é
+sorteada separadamente) é copiada para uma fila limitada em número de
+linhas e pontuada em segundo plano por um modelo candidato, carregado ao
+lado do principal. O relatório compara as duas probabilidades (diferença média e
+máxima, taxa de troca de categoria de risco) e a latência do candidato.
+
+O caminho da resposta principal nunca espera pelo candidato: a cópia é
+um put_nowait e as linhas que passariam do limite de pendentes são
+descartadas e contadas. Assim a memória da fila fica limitada mesmo com
+lotes grandes.
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+import logging
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Latências guardadas para os percentis do relatório (janela deslizante)
+LATENCY_WINDOW = 1000
+
+# Limites do histograma de |diferença| em pontos percentuais
+DIFF_BINS = np.array([1.0, 5.0, 10.0, 20.0])
+
+
+class ShadowEvaluator:
+    """
+    Pontua amostras do tráfego com um modelo candidato em uma thread própria.
+
+    Args:
+        model: Pipeline candidato
+        feature_names: Ordem das colunas
+        categorize: Função probabilidade (%) → código da categoria de risco
+        categories: Nomes das categorias (índice = código)
+        sample_rate: Fração das linhas copiadas (0-1)
+        max_pending_rows: Máximo de linhas aguardando o candidato
+        label: Identificação do candidato no relatório (ex.: caminho)
+    """
+
+    def __init__(self, model, feature_names, categorize: Callable[[np.ndarray], np.ndarray],
+                 categories, sample_rate: float = 0.1, max_pending_rows: int = 10000,
+                 label: Optional[str] = None):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.categorize = categorize
+        self.categories = list(categories)
+        self.sample_rate = sample_rate
+        self.label = label
+        self.max_pending_rows = max_pending_rows
+
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng()
+        self._pending_rows = 0
+
+        n_categories = len(self.categories)
+        self.offered = 0       # linhas
+        self.dropped = 0       # linhas
+        self.errors = 0
+        self.rows = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.diff_histogram = np.zeros(len(DIFF_BINS) + 1, dtype=np.int64)
+        self.transitions = np.zeros((n_categories, n_categories), dtype=np.int64)
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+        self._thread = threading.Thread(target=self._run, name='shadow-worker', daemon=True)
+        self._thread.start()
+
+    # ---------- caminho da requisição principal ----------
+
+    def offer(self, X: np.ndarray, primary_probability: np.ndarray) -> None:
+        """
+        Copia uma amostra das linhas para a fila. Nunca bloqueia.
+
+        Args:
+            X: Linhas pontuadas pelo modelo principal (n × features)
+            primary_probability: Probabilidades (%) do modelo principal
+        """
+        n_rows = len(X)
+        if n_rows == 1:
+            # Caminho de /predict: um sorteio, sem arrays temporários
+            if random.random() >= self.sample_rate:
+                return
+            sample = np.arange(1)
+        else:
+            sample = np.flatnonzero(self._rng.random(n_rows) < self.sample_rate)
+            if not len(sample):
+                return
+
+        # Só entra o que cabe no limite de linhas pendentes; o resto é descartado
+        with self._lock:
+            room = max(self.max_pending_rows - self._pending_rows, 0)
+            kept = min(len(sample), room)
+            self.dropped += len(sample) - kept
+            if not kept:
+                return
+            self._pending_rows += kept
+            self.offered += kept
+        sample = sample[:kept]
+        self._queue.put_nowait((
+            np.array(np.asarray(X)[sample], dtype=float),
+            np.array(np.asarray(primary_probability)[sample], dtype=float)
+        ))
+
+    # ---------- thread do candidato ----------
+
+    def _run(self) -> None:
+        while True:
+            X, primary = self._queue.get()
+            try:
+                start = time.perf_counter()
+                proba = self.model.predict_proba(pd.DataFrame(X, columns=self.feature_names))
+                latency_ms = (time.perf_counter() - start) * 1000
+                self._record(primary, proba[:, 1] * 100, latency_ms)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Erro no modelo sombra: {e}")
+            finally:
+                with self._lock:
+                    self._pending_rows -= len(X)
+                self._queue.task_done()
+
+    def _record(self, primary: np.ndarray, shadow: np.ndarray, latency_ms: float) -> None:
+        diff = shadow - primary
+        abs_diff = np.abs(diff)
+        primary_category = self.categorize(primary)
+        shadow_category = self.categorize(shadow)
+
+        with self._lock:
+            self.rows += len(diff)
+            self.sum_diff += float(diff.sum())
+            self.sum_abs_diff += float(abs_diff.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max()))
+            self.diff_histogram += np.bincount(
+                np.searchsorted(DIFF_BINS, abs_diff, side='right'), minlength=len(DIFF_BINS) + 1
+            )
+            np.add.at(self.transitions, (primary_category, shadow_category), 1)
+            self.latencies_ms.append(latency_ms / len(diff))
+
+    # ---------- relatório ----------
+
+    def report(self) -> Dict[str, Any]:
+        """Resumo da comparação candidato × principal."""
+        with self._lock:
+            rows = self.rows
+            flips = int(self.transitions.sum() - np.trace(self.transitions))
+            latencies = np.array(self.latencies_ms) if self.latencies_ms else None
+            bin_labels = [f"<{DIFF_BINS[0]:g}"] + [
+                f"{low:g}-{high:g}" for low, high in zip(DIFF_BINS[:-1], DIFF_BINS[1:])
+            ] + [f">={DIFF_BINS[-1]:g}"]
+
+            return {
+                "candidate": self.label,
+                "sample_rate": self.sample_rate,
+                "queue": {
+                    "pending_rows": self._pending_rows,
+                    "capacity_rows": self.max_pending_rows,
+                    "offered": self.offered,
+                    "dropped": self.dropped,
+                    "errors": self.errors
+                },
+                "rows_compared": rows,
+                "probability_diff": {
+                    "mean": self.sum_diff / rows if rows else None,
+                    "mean_abs": self.sum_abs_diff / rows if rows else None,
+                    "max_abs": self.max_abs_diff if rows else None,
+                    "histogram_abs": dict(zip(bin_labels, self.diff_histogram.tolist()))
+                },
+                "category_flips": {
+                    "count": flips,
+                    "rate": flips / rows if rows else None,
+                    "transitions": {
+                        primary: dict(zip(self.categories, counts))
+                        for primary, counts in zip(self.categories, self.transitions.tolist())
+                    }
+                },
+                "latency_ms_per_row": {
+                    "p50": float(np.percentile(latencies, 50)) if latencies is not None else None,
+                    "p95": float(np.percentile(latencies, 95)) if latencies is not None else None,
+                    "max": float(latencies.max()) if latencies is not None else None
+                }
+            }
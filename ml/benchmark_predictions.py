@@ -0,0 +1,252 @@
+"""
+⏱️ Benchmark - Tempo e alocações por predição
+
+Mede, com tracemalloc, o tempo e a memória alocada por predição em dois
+cenários:
+- Uma linha por chamada (predict_cardiovascular_risk)
+- Lote de 10 mil linhas (predict_cardiovascular_risk_batch)
+
+Para cada um, separa o custo total do custo de montar a resposta
+(modelo fora da conta), que é o que as estruturas compactas reduzem, e
+mede a montagem da resposta também com a implementação original (um
+dicionário por fator, regras em if/elif por paciente) para comparação.
+
+Uso:
+    python benchmark_predictions.py
+    python benchmark_predictions.py --model outro_modelo.joblib --batch-size 10000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+import inference_core
+import ml_service
+
+
+def make_patients(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Gera pacientes sintéticos válidos."""
+    rng = np.random.default_rng(seed)
+    ap_hi = rng.integers(95, 200, n)
+    columns = {
+        'gender': rng.integers(0, 2, n),
+        'ap_hi': ap_hi,
+        'ap_lo': np.minimum(rng.integers(60, 120, n), ap_hi - 10),
+        'smoke': rng.integers(0, 2, n),
+        'alco': rng.integers(0, 2, n),
+        'active': rng.integers(0, 2, n),
+        'age_years': rng.integers(25, 85, n),
+        'bmi': np.round(rng.uniform(18.0, 42.0, n), 1),
+        'cholesterol_high': rng.integers(0, 2, n),
+        'gluc_high': rng.integers(0, 2, n)
+    }
+    return [
+        {name: columns[name][i].item() for name in ml_service.FEATURE_NAMES}
+        for i in range(n)
+    ]
+
+
+# ==================== IMPLEMENTAÇÃO ORIGINAL (REFERÊNCIA) ====================
+
+def _original_risk_factors(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Fatores de risco como eram montados antes das estruturas compactas."""
+    imp = ml_service.FEATURE_IMPORTANCES
+    factors = []
+    if data['ap_hi'] >= 140 or data['ap_lo'] >= 90:
+        severity = "CRÍTICO" if data['ap_hi'] >= 180 else "ALTO" if data['ap_hi'] >= 140 else "MODERADO"
+        factors.append({"factor": "Hipertensão", "description": f"Pressão arterial elevada ({data['ap_hi']}/{data['ap_lo']} mmHg)",
+                        "severity": severity, "importance": imp['ap_hi'],
+                        "recommendation": "Monitorar pressão diariamente e consultar cardiologista"})
+    if data['bmi'] >= 30:
+        severity = "CRÍTICO" if data['bmi'] >= 40 else "ALTO" if data['bmi'] >= 35 else "MODERADO"
+        factors.append({"factor": "Obesidade", "description": f"IMC elevado ({data['bmi']:.1f} kg/m²)",
+                        "severity": severity, "importance": imp['bmi'],
+                        "recommendation": "Adotar dieta balanceada e programa de exercícios"})
+    elif data['bmi'] >= 25:
+        factors.append({"factor": "Sobrepeso", "description": f"IMC acima do ideal ({data['bmi']:.1f} kg/m²)",
+                        "severity": "MODERADO", "importance": imp['bmi'],
+                        "recommendation": "Controlar peso com alimentação saudável"})
+    if data['age_years'] >= 60:
+        factors.append({"factor": "Idade Avançada", "description": f"{data['age_years']} anos",
+                        "severity": "ALTO" if data['age_years'] >= 70 else "MODERADO",
+                        "importance": imp['age_years'], "recommendation": "Check-ups cardiológicos regulares"})
+    for feature, value, factor, description, severity, recommendation in (
+        ('cholesterol_high', 1, "Colesterol Elevado", "Colesterol acima do normal", "ALTO",
+         "Dieta com baixo colesterol e possível medicação"),
+        ('gluc_high', 1, "Glicose Elevada", "Glicemia acima do normal", "ALTO", "Investigar diabetes e controlar açúcar"),
+        ('smoke', 1, "Tabagismo", "Fumante ativo", "ALTO", "PARAR DE FUMAR urgentemente"),
+        ('active', 0, "Sedentarismo", "Não pratica atividade física regular", "MODERADO",
+         "Iniciar programa de exercícios (30 min/dia)"),
+        ('alco', 1, "Consumo de Álcool", "Consome bebidas alcoólicas", "MODERADO", "Reduzir ou evitar consumo de álcool"),
+    ):
+        if data[feature] == value:
+            factors.append({"factor": factor, "description": description, "severity": severity,
+                            "importance": imp[feature], "recommendation": recommendation})
+    factors.sort(key=lambda x: x['importance'], reverse=True)
+    return factors or [dict(ml_service._NO_RISK_FACTOR)]
+
+
+def _original_response(patient: Dict[str, Any], probability: float, confidence: float) -> Dict[str, Any]:
+    """Resposta como era montada antes das estruturas compactas (probabilidade já calculada)."""
+    if probability < 30:
+        risk_level, risk_category, recommendation = ml_service._RISK_CLASSES[0]
+    elif probability < 60:
+        risk_level, risk_category, recommendation = ml_service._RISK_CLASSES[1]
+    else:
+        risk_level, risk_category, recommendation = ml_service._RISK_CLASSES[2]
+
+    feature_importance_list = []
+    for feature, importance in sorted(ml_service.FEATURE_IMPORTANCES.items(), key=lambda x: x[1], reverse=True):
+        value = patient[feature]
+        if feature == 'gender':
+            value_display = "Masculino" if value == 1 else "Feminino"
+        elif feature in ['smoke', 'alco', 'active', 'cholesterol_high', 'gluc_high']:
+            value_display = "Sim" if value == 1 else "Não"
+        elif feature == 'bmi':
+            value_display = f"{value:.1f} kg/m²"
+        elif feature in ['ap_hi', 'ap_lo']:
+            value_display = f"{value} mmHg"
+        elif feature == 'age_years':
+            value_display = f"{value} anos"
+        else:
+            value_display = str(value)
+        feature_importance_list.append({
+            "feature": feature,
+            "feature_name": ml_service.get_feature_display_name(feature),
+            "importance": float(importance),
+            "importance_percentage": float(importance * 100),
+            "value": value,
+            "value_display": value_display
+        })
+
+    return {
+        "success": True,
+        "probability": round(probability, 2),
+        "risk_level": risk_level,
+        "risk_category": risk_category,
+        "confidence": round(confidence, 2),
+        "recommendation": recommendation,
+        "top_risk_factors": _original_risk_factors(patient),
+        "feature_importance": feature_importance_list
+    }
+
+
+# ==================== MEDIÇÃO ====================
+
+def measure(func: Callable[[], Any], n_predictions: int, repeat: int = 5) -> Dict[str, float]:
+    """
+    Mede func: tempo (melhor de `repeat` execuções, sem tracemalloc, que
+    deixa cada alocação bem mais lenta) e alocações em uma execução à parte.
+    Cada execução começa após uma coleta completa do GC.
+
+    Returns:
+        Microssegundos, bytes alocados (pico) e blocos retidos por predição
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        gc.collect()  # cada execução parte do mesmo heap, sem lixo do cenário anterior
+        start = time.perf_counter()
+        result = func()
+        elapsed = min(elapsed, time.perf_counter() - start)
+        del result
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot()
+
+        result = func()
+
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+
+    return {
+        "us_per_prediction": elapsed / n_predictions * 1e6,
+        "peak_bytes_per_prediction": (peak - baseline) / n_predictions,
+        "blocks_per_prediction": blocks / n_predictions
+    }
+
+
+def run_benchmark(n_single: int = 200, batch_size: int = 10_000) -> Dict[str, Dict[str, float]]:
+    """Roda os cenários e retorna as medições."""
+    single_patients = make_patients(n_single, seed=1)
+    batch_patients = make_patients(batch_size, seed=2)
+
+    # Aquece o modelo (threads do joblib, caches do sklearn)
+    ml_service.predict_cardiovascular_risk(single_patients[0])
+
+    # Probabilidades pré-calculadas para medir só a montagem da resposta
+    X_single = inference_core.prepare_matrix(inference_core.to_matrix(single_patients))
+    X_batch = inference_core.prepare_matrix(inference_core.to_matrix(batch_patients))
+    scores_single = inference_core.score_matrix(X_single)
+    scores_batch = inference_core.score_matrix(X_batch)
+
+    def build_single():
+        return [
+            ml_service._build_responses(X_single[i:i + 1], *(s[i:i + 1] for s in scores_single))[0]
+            for i in range(n_single)
+        ]
+
+    def build_batch():
+        return ml_service._build_responses(X_batch, *scores_batch)
+
+    def build_original(patients, scores):
+        probability, confidence = scores[0].tolist(), scores[1].tolist()
+        return [_original_response(p, probability[i], confidence[i]) for i, p in enumerate(patients)]
+
+    def build_original_single():
+        # Como no caminho original de uma linha: float() dos arrays a cada chamada
+        probability, confidence = scores_single[0], scores_single[1]
+        return [
+            _original_response(p, float(probability[i]), float(confidence[i]))
+            for i, p in enumerate(single_patients)
+        ]
+
+    return {
+        "linha única (total)": measure(
+            lambda: [ml_service.predict_cardiovascular_risk(p) for p in single_patients], n_single
+        ),
+        "linha única (resposta)": measure(build_single, n_single),
+        "linha única (resp. original)": measure(build_original_single, n_single),
+        f"lote {batch_size} (total)": measure(
+            lambda: ml_service.predict_cardiovascular_risk_batch(batch_patients), batch_size
+        ),
+        f"lote {batch_size} (resposta)": measure(build_batch, batch_size),
+        f"lote {batch_size} (resp. original)": measure(
+            lambda: build_original(batch_patients, scores_batch), batch_size
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de tempo e alocações por predição")
+    parser.add_argument('--model', type=Path, help="Caminho do .joblib (padrão: ml/random_forest_pipeline.joblib)")
+    parser.add_argument('--single', type=int, default=200, help="Predições de linha única")
+    parser.add_argument('--batch-size', type=int, default=10_000, help="Tamanho do lote")
+    args = parser.parse_args()
+
+    if args.model:
+        inference_core.MODEL.path = args.model
+
+    print("=" * 70)
+    print("⏱️ BENCHMARK DE PREDIÇÃO (tempo e alocações por predição)")
+    print("=" * 70)
+
+    results = run_benchmark(args.single, args.batch_size)
+
+    print(f"\n{'cenário':<32}{'µs/pred':>12}{'pico B/pred':>14}{'blocos/pred':>14}")
+    for name, r in results.items():
+        print(f"{name:<32}{r['us_per_prediction']:>12.1f}"
+              f"{r['peak_bytes_per_prediction']:>14.0f}{r['blocks_per_prediction']:>14.1f}")
+    print("\n" + "=" * 70)
@@ -0,0 +1,97 @@
+"""
+🔒 Verificação - Núcleo de inferência compartilhado
+
+Confere, em um único processo, que:
+- N threads chamando load_model() ao mesmo tempo disparam um único
+  carregamento e recebem o mesmo objeto
+- api/api_server.py e ml/ml_service.py usam essa mesma instância
+- há um único RandomForestClassifier vivo no processo (uma cópia residente)
+- API e ml_service dão a mesma probabilidade para o mesmo paciente
+
+Uso:
+    python check_inference_core.py
+    python check_inference_core.py --model outro_modelo.joblib --threads 32
+"""
+
+import argparse
+import gc
+import sys
+import threading
+from pathlib import Path
+
+from sklearn.ensemble import RandomForestClassifier
+
+import inference_core
+
+EXAMPLE_PATIENT = {
+    'gender': 1, 'ap_hi': 140, 'ap_lo': 90, 'smoke': 0, 'alco': 0, 'active': 1,
+    'age_years': 52, 'bmi': 27.5, 'cholesterol_high': 1, 'gluc_high': 0
+}
+
+
+def load_concurrently(n_threads: int) -> list:
+    """Chama load_model() em n_threads liberadas juntas por uma barreira."""
+    barrier = threading.Barrier(n_threads)
+    models = [None] * n_threads
+
+    def worker(i: int):
+        barrier.wait()
+        models[i] = inference_core.load_model()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return models
+
+
+def live_forests() -> int:
+    """Quantos RandomForestClassifier existem no processo."""
+    gc.collect()
+    return sum(isinstance(obj, RandomForestClassifier) for obj in gc.get_objects())
+
+
+def run_checks(n_threads: int = 16) -> None:
+    models = load_concurrently(n_threads)
+
+    import ml_service
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+    import api_server
+
+    print(f"🧵 {n_threads} threads → carregamentos: {inference_core.MODEL.load_count}")
+    assert inference_core.MODEL.load_count == 1, "modelo carregado mais de uma vez"
+    assert all(m is models[0] for m in models), "threads receberam objetos diferentes"
+
+    assert ml_service.load_model() is models[0], "ml_service usa outra instância"
+    assert api_server.load_model() is models[0], "api_server usa outra instância"
+    print("🔗 api_server e ml_service compartilham a mesma instância")
+
+    n_forests = live_forests()
+    print(f"💾 Cópias do modelo residentes: {n_forests}")
+    assert n_forests == 1, "mais de uma cópia do modelo em memória"
+
+    api_result = api_server.predict_patient(api_server.PatientData(**EXAMPLE_PATIENT))
+    ml_result = ml_service.predict_cardiovascular_risk(EXAMPLE_PATIENT)
+    assert api_result.probability == ml_result["probability"], "API e ml_service divergem"
+    assert api_result.risk_category == ml_result["risk_category"]
+    print(f"🎯 Mesma predição nos dois caminhos: {api_result.probability}% ({api_result.risk_category})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica o carregamento único do modelo compartilhado")
+    parser.add_argument('--model', type=Path, help="Caminho do .joblib (padrão: ml/random_forest_pipeline.joblib)")
+    parser.add_argument('--threads', type=int, default=16, help="Threads simultâneas")
+    args = parser.parse_args()
+
+    if args.model:
+        inference_core.MODEL.path = args.model
+
+    print("=" * 70)
+    print("🔒 VERIFICAÇÃO DO NÚCLEO DE INFERÊNCIA")
+    print("=" * 70)
+
+    run_checks(args.threads)
+
+    print("\n✅ Todas as verificações passaram")
+    print("=" * 70)
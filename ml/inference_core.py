@@ -0,0 +1,307 @@
+"""
+🫀 Núcleo de Inferência - Predição de Risco Cardiovascular
+
+Fonte única do que a API (api/api_server.py) e o serviço de ML
+(ml/ml_service.py) compartilham:
+- ordem das features, faixas válidas e faixas de risco
+- caminho do artefato e handle do modelo (carregado uma única vez por
+  processo, protegido por lock)
+- metadados e versão do modelo
+- pontuação em lote (matriz n × 10 → probabilidade, confiança, categoria)
+
+Os dois módulos são apenas camadas finas sobre este: a API cuida de HTTP
+e Pydantic, o ml_service monta as respostas com explicações.
+
+Modelo: Random Forest Pipeline com RobustScaler
+Caminho: ml/random_forest_pipeline.joblib (ou variável CARDIO_MODEL_PATH)
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURAÇÃO ====================
+
+# Nomes das features esperadas pelo modelo (ordem EXATA)
+FEATURE_NAMES = [
+    'gender',           # 0=feminino, 1=masculino
+    'ap_hi',            # Pressão sistólica (mmHg)
+    'ap_lo',            # Pressão diastólica (mmHg)
+    'smoke',            # 0=não fuma, 1=fuma
+    'alco',             # 0=não bebe, 1=bebe
+    'active',           # 0=sedentário, 1=ativo
+    'age_years',        # Idade em anos
+    'bmi',              # IMC (kg/m²)
+    'cholesterol_high', # 0=normal, 1=alto
+    'gluc_high'         # 0=normal, 1=alta
+]
+
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+BINARY_FEATURES = ['gender', 'smoke', 'alco', 'active', 'cholesterol_high', 'gluc_high']
+INTEGER_FEATURES = {'gender', 'ap_hi', 'ap_lo', 'smoke', 'alco', 'active',
+                    'age_years', 'cholesterol_high', 'gluc_high'}
+
+# Faixas aceitas (as binárias são checadas em BINARY_FEATURES)
+VALID_RANGES = {
+    'ap_hi': (80, 250),
+    'ap_lo': (40, 180),
+    'age_years': (18, 120),
+    'bmi': (10.0, 60.0)
+}
+
+# Faixas de risco: probabilidade < 30 → baixo, < 60 → médio, senão alto
+RISK_THRESHOLDS = np.array([30.0, 60.0])
+RISK_LEVELS = ("baixo", "médio", "alto")
+RISK_CATEGORIES = ("sem_risco", "risco_moderado", "alto_risco")
+
+# Caminho do modelo
+MODEL_PATH = Path(os.getenv("CARDIO_MODEL_PATH") or Path(__file__).parent / 'random_forest_pipeline.joblib')
+
+
+def metadata_path_for(model_path: Path) -> Path:
+    """Caminho do arquivo de metadados que acompanha o artefato."""
+    return Path(model_path).with_suffix('.metadata.json')
+
+
+def file_sha256(path: Path) -> str:
+    """Calcula o SHA-256 de um arquivo (identifica a versão do modelo)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ==================== HANDLE DO MODELO ====================
+
+class LoadedModel(NamedTuple):
+    """Modelo carregado e tudo que foi lido junto com ele."""
+    model: Any
+    metadata: Dict[str, Any]
+    version: str
+    path: Path
+
+
+class ModelHandle:
+    """
+    Handle do modelo, compartilhado pelo processo inteiro.
+
+    get() carrega o modelo na primeira chamada; chamadas simultâneas
+    esperam o mesmo carregamento (lock com dupla checagem), então há uma
+    única cópia residente. reload() troca o modelo de uma vez: até a troca,
+    as requisições continuam usando o anterior sem bloquear.
+
+    Funções registradas com add_listener() são chamadas a cada
+    carregamento (ex.: a API recalcula curvas e o monitor de drift), já
+    fora do lock do modelo: quem espera pelo get() não espera pelos
+    listeners, e um listener pode chamar get()/reload() sem deadlock.
+    As notificações são serializadas e a de um carregamento já superado
+    por outro mais novo é descartada.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.load_count = 0
+        self._lock = threading.Lock()
+        self._notify_lock = threading.RLock()
+        self._loaded: Optional[LoadedModel] = None
+        self._listeners: List[Callable[[LoadedModel], None]] = []
+
+    def get(self) -> LoadedModel:
+        loaded = self._loaded
+        if loaded is None:
+            new = None
+            with self._lock:
+                if self._loaded is None:
+                    new = self._load(self.path)
+                    listeners = list(self._listeners)
+                loaded = self._loaded
+            if new is not None:
+                self._notify(new, listeners)
+        return loaded
+
+    def reload(self, path: Optional[Path] = None) -> LoadedModel:
+        """Carrega novamente do disco (opcionalmente de outro caminho) e troca o modelo."""
+        with self._lock:
+            loaded = self._load(Path(path) if path else self.path)
+            listeners = list(self._listeners)
+        self._notify(loaded, listeners)
+        return loaded
+
+    def add_listener(self, listener: Callable[[LoadedModel], None]) -> None:
+        """Registra uma função chamada a cada carregamento (e já chama se houver modelo)."""
+        with self._notify_lock:
+            with self._lock:
+                self._listeners.append(listener)
+                loaded = self._loaded
+            if loaded is not None:
+                listener(loaded)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded is not None
+
+    def _load(self, path: Path) -> LoadedModel:
+        if not path.exists():
+            raise FileNotFoundError(
+                f"❌ Modelo não encontrado em: {path}\n"
+                f"Certifique-se de que o arquivo 'random_forest_pipeline.joblib' "
+                f"está na pasta 'ml/' (ou defina CARDIO_MODEL_PATH)"
+            )
+
+        logger.info(f"📦 Carregando modelo de: {path}")
+        model = joblib.load(path)
+
+        # Metadados gravados pelo ml/train_model.py (opcionais)
+        metadata = {}
+        metadata_path = metadata_path_for(path)
+        if metadata_path.exists():
+            with open(metadata_path, encoding='utf-8') as f:
+                metadata = json.load(f)
+
+        # A versão vem sempre do arquivo: metadados de outro artefato (ex.:
+        # .joblib trocado sem o .metadata.json) são ignorados por inteiro,
+        # senão curvas, perfil de drift e versão seriam os do modelo antigo
+        version = file_sha256(path)
+        if metadata and metadata.get("model_sha256") != version:
+            logger.warning(f"⚠️ Metadados de {metadata_path} não correspondem ao modelo "
+                           f"(sha {str(metadata.get('model_sha256'))[:12]} ≠ {version[:12]}); ignorando")
+            metadata = {}
+
+        self._loaded = LoadedModel(model, metadata, version, path)
+        self.path = path
+        self.load_count += 1
+        logger.info(f"✅ Modelo carregado com sucesso! (versão {version[:12]})")
+        return self._loaded
+
+    def _notify(self, loaded: LoadedModel, listeners: List[Callable[[LoadedModel], None]]) -> None:
+        """Chama os listeners (fora do lock do modelo), a menos que já haja um modelo mais novo."""
+        with self._notify_lock:
+            if loaded is not self._loaded:
+                return
+            for listener in listeners:
+                try:
+                    listener(loaded)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao notificar carregamento do modelo: {e}")
+
+
+# Único handle do processo
+MODEL = ModelHandle(MODEL_PATH)
+
+
+def load_model():
+    """
+    Retorna o pipeline treinado (RobustScaler + RandomForestClassifier),
+    carregando do disco apenas na primeira chamada do processo.
+    """
+    return MODEL.get().model
+
+
+def get_model_version() -> str:
+    """Versão (SHA-256 do artefato) do modelo carregado."""
+    return MODEL.get().version
+
+
+def get_model_metadata() -> Dict[str, Any]:
+    """Metadados gravados junto com o modelo (vazio se não houver)."""
+    return MODEL.get().metadata
+
+
+def model_info() -> Dict[str, Any]:
+    """Informações do modelo carregado, lidas do próprio classificador."""
+    loaded = MODEL.get()
+    classifier = loaded.model.named_steps['classifier']
+
+    return {
+        "model_type": "RandomForestClassifier",
+        "n_estimators": classifier.n_estimators,
+        "max_depth": classifier.max_depth,
+        "n_features": classifier.n_features_in_,
+        "feature_names": FEATURE_NAMES,
+        "feature_importances": dict(zip(FEATURE_NAMES, map(float, classifier.feature_importances_))),
+        "preprocessing": ["RobustScaler"],
+        "model_version": loaded.version
+    }
+
+
+# ==================== DADOS ====================
+
+def to_matrix(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """Converte dicionários de pacientes na matriz de features (NaN = campo ausente)."""
+    return np.array(
+        [[row.get(name, np.nan) for name in FEATURE_NAMES] for row in rows],
+        dtype=float
+    ).reshape(len(rows), len(FEATURE_NAMES))
+
+
+def valid_rows(X: np.ndarray, strict_integers: bool = False) -> np.ndarray:
+    """
+    Valida todas as linhas de uma vez.
+
+    Args:
+        X: Matriz (n × 10) na ordem de FEATURE_NAMES
+        strict_integers: Se True, campos inteiros com parte fracionária são
+            inválidos (como no Pydantic); senão são truncados na pontuação
+
+    Returns:
+        Máscara booleana de linhas válidas
+    """
+    col = lambda name: X[:, FEATURE_INDEX[name]]
+    binary = X[:, [FEATURE_INDEX[f] for f in BINARY_FEATURES]]
+
+    valid = ~np.isnan(X).any(axis=1) & np.isin(binary, (0, 1)).all(axis=1)
+    for name, (low, high) in VALID_RANGES.items():
+        valid &= (col(name) >= low) & (col(name) <= high)
+    valid &= col('ap_hi') > col('ap_lo')
+
+    if strict_integers:
+        integers = X[:, [FEATURE_INDEX[f] for f in FEATURE_NAMES if f in INTEGER_FEATURES]]
+        valid &= (integers == np.floor(integers)).all(axis=1)
+    return valid
+
+
+_INTEGER_COLUMNS = [FEATURE_INDEX[f] for f in FEATURE_NAMES if f in INTEGER_FEATURES]
+
+
+def prepare_matrix(X: np.ndarray) -> np.ndarray:
+    """Cópia da matriz com os campos inteiros truncados, como int() fazia por paciente."""
+    X = np.array(X, dtype=float)
+    X[:, _INTEGER_COLUMNS] = np.trunc(X[:, _INTEGER_COLUMNS])
+    return X
+
+
+def to_frame(X: np.ndarray) -> pd.DataFrame:
+    """DataFrame na ordem exata esperada pelo modelo."""
+    return pd.DataFrame(prepare_matrix(X), columns=FEATURE_NAMES)
+
+
+# ==================== PONTUAÇÃO ====================
+
+def risk_category_codes(probability: np.ndarray) -> np.ndarray:
+    """Índice em RISK_LEVELS / RISK_CATEGORIES para probabilidades em %."""
+    return np.searchsorted(RISK_THRESHOLDS, probability, side='right').astype(np.uint8)
+
+
+def score_matrix(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pontua uma matriz de pacientes já validada (n × 10, ordem de FEATURE_NAMES).
+
+    Returns:
+        Tupla (probabilidade %, confiança %, código da categoria de risco)
+    """
+    proba = load_model().predict_proba(to_frame(X))
+    probability = proba[:, 1] * 100   # Probabilidade de doença (classe 1)
+    confidence = proba.max(axis=1) * 100  # Confiança na predição
+    return probability, confidence, risk_category_codes(probability)
@@ -1,40 +1,37 @@
 """
 🧠 Serviço de Machine Learning - Predição de Risco Cardiovascular
 
-Este módulo carrega o modelo Random Forest treinado e fornece funções
-para predição de risco de doença cardiovascular.
+Este módulo fornece funções para predição de risco de doença
+cardiovascular com explicações (fatores de risco, importância das
+variáveis). O modelo, a ordem das features e as faixas de risco vêm do
+núcleo compartilhado com a API (inference_core.py).
 
 Modelo: Random Forest Pipeline com RobustScaler
 Entrada: 10 features (gender, ap_hi, ap_lo, smoke, alco, active, age_years, bmi, cholesterol_high, gluc_high)
 Saída: Probabilidade (0-100%) e classificação de risco
 """
 
-import joblib
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional, Callable, Union
+from itertools import islice
+import json
+import struct
 import warnings
 
+import inference_core
+from inference_core import (
+    BINARY_FEATURES, FEATURE_NAMES, INTEGER_FEATURES, RISK_CATEGORIES, RISK_LEVELS,
+    VALID_RANGES
+)
+
 warnings.filterwarnings('ignore')
 
 # ==================== CONFIGURAÇÃO ====================
 
-# Nomes das features esperadas pelo modelo (ordem EXATA)
-FEATURE_NAMES = [
-    'gender',           # 0=feminino, 1=masculino
-    'ap_hi',            # Pressão sistólica (mmHg)
-    'ap_lo',            # Pressão diastólica (mmHg)
-    'smoke',            # 0=não fuma, 1=fuma
-    'alco',             # 0=não bebe, 1=bebe
-    'active',           # 0=sedentário, 1=ativo
-    'age_years',        # Idade em anos
-    'bmi',              # IMC (kg/m²)
-    'cholesterol_high', # 0=normal, 1=alto
-    'gluc_high'         # 0=normal, 1=alta
-]
-
-# Importâncias das features (do modelo treinado - ordem decrescente)
+# Importâncias de referência (ordem decrescente), fixas para ordenar as explicações
+# das respostas; as do modelo carregado vêm de inference_core.model_info()
 FEATURE_IMPORTANCES = {
     'ap_hi': 0.185,          # Pressão sistólica - 18.5%
     'bmi': 0.162,            # IMC - 16.2%
@@ -48,40 +45,28 @@ FEATURE_IMPORTANCES = {
     'alco': 0.028            # Álcool - 2.8%
 }
 
-# Cache do modelo
-_MODEL_CACHE = None
+# Nome e unidade das faixas de inference_core.VALID_RANGES nas mensagens de erro
+_RANGE_LABELS = {
+    'ap_hi': ("Pressão sistólica", "mmHg"),
+    'ap_lo': ("Pressão diastólica", "mmHg"),
+    'age_years': ("Idade", "anos"),
+    'bmi': ("IMC", "kg/m²")
+}
 
 
 # ==================== FUNÇÕES PRINCIPAIS ====================
 
 def load_model():
     """
-    Carrega o modelo Random Forest do disco.
-    Mantém em cache para evitar recarregamento.
+    Retorna o modelo Random Forest.
+    
+    O carregamento fica no inference_core: uma única cópia por processo,
+    compartilhada com a API mesmo quando os dois módulos são importados.
     
     Returns:
         Pipeline treinado (RobustScaler + RandomForestClassifier)
     """
-    global _MODEL_CACHE
-    
-    if _MODEL_CACHE is not None:
-        return _MODEL_CACHE
-    
-    # Caminho do modelo
-    model_path = Path(__file__).parent / 'random_forest_pipeline.joblib'
-    
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"❌ Modelo não encontrado em: {model_path}\n"
-            f"Certifique-se de que o arquivo 'random_forest_pipeline.joblib' "
-            f"está na pasta 'ml/'"
-        )
-    
-    print(f"📦 Carregando modelo de: {model_path}")
-    _MODEL_CACHE = joblib.load(model_path)
-    print("✅ Modelo carregado com sucesso!")
-    
-    return _MODEL_CACHE
+    return inference_core.load_model()
 
 
 def calculate_bmi(weight_kg: float, height_cm: float) -> float:
@@ -117,8 +102,7 @@ def validate_input(data: Dict[str, Any]) -> Tuple[bool, str]:
         return False, f"Campos obrigatórios faltando: {', '.join(missing)}"
     
     # Validar valores binários (0 ou 1)
-    binary_fields = ['gender', 'smoke', 'alco', 'active', 'cholesterol_high', 'gluc_high']
-    for field in binary_fields:
+    for field in BINARY_FEATURES:
         if data[field] not in [0, 1]:
             return False, f"{field} deve ser 0 ou 1"
     
@@ -126,23 +110,238 @@ def validate_input(data: Dict[str, Any]) -> Tuple[bool, str]:
     if data['ap_hi'] <= data['ap_lo']:
         return False, "Pressão sistólica deve ser maior que diastólica"
     
-    if not (80 <= data['ap_hi'] <= 250):
-        return False, "Pressão sistólica deve estar entre 80-250 mmHg"
-    
-    if not (40 <= data['ap_lo'] <= 180):
-        return False, "Pressão diastólica deve estar entre 40-180 mmHg"
-    
-    # Validar idade
-    if not (18 <= data['age_years'] <= 120):
-        return False, "Idade deve estar entre 18-120 anos"
-    
-    # Validar IMC
-    if not (10 <= data['bmi'] <= 60):
-        return False, "IMC deve estar entre 10-60 kg/m²"
+    # Validar faixas (as mesmas do núcleo de inferência)
+    for field, (low, high) in VALID_RANGES.items():
+        if not (low <= data[field] <= high):
+            label, unit = _RANGE_LABELS.get(field, (field, ""))
+            return False, f"{label} deve estar entre {low:g}-{high:g} {unit}".rstrip()
     
     return True, "OK"
 
 
+# ==================== ESTRUTURAS COMPACTAS DA RESPOSTA ====================
+#
+# As partes fixas da resposta (nomes, importâncias, textos das regras) são
+# montadas uma única vez na importação. Os arrays pontuados são convertidos
+# para Python uma única vez por lote (tolist) e os dicionários completos são
+# criados apenas na serialização (_response).
+
+_SEVERITIES = ("BAIXO", "MODERADO", "ALTO", "CRÍTICO")
+_MODERADO, _ALTO, _CRITICO = 1, 2, 3
+
+# Recomendação por categoria de risco (ordem de RISK_LEVELS / RISK_CATEGORIES)
+_RECOMMENDATIONS = (
+    "✅ Seu risco cardiovascular é baixo. Mantenha hábitos saudáveis e faça check-ups regulares anuais.",
+    "⚠️ Seu risco cardiovascular é moderado. Consulte um médico para avaliação detalhada e considere mudanças no estilo de vida.",
+    "🚨 Seu risco cardiovascular é ALTO. Procure um cardiologista URGENTEMENTE para avaliação e acompanhamento médico."
+)
+_RISK_CLASSES = tuple(zip(RISK_LEVELS, RISK_CATEGORIES, _RECOMMENDATIONS))
+
+
+# Formatação de exibição por feature (escolhida uma vez, não por valor)
+_VALUE_FORMATTERS = {
+    'gender': lambda value: "Masculino" if value == 1 else "Feminino",
+    **{feature: (lambda value: "Sim" if value == 1 else "Não")
+       for feature in BINARY_FEATURES if feature != 'gender'},
+    'bmi': lambda value: f"{value:.1f} kg/m²",
+    'ap_hi': lambda value: f"{value} mmHg",
+    'ap_lo': lambda value: f"{value} mmHg",
+    'age_years': lambda value: f"{value} anos",
+}
+
+
+def _format_value(feature: str, value: Any) -> str:
+    """Formata o valor de uma feature para exibição."""
+    return _VALUE_FORMATTERS.get(feature, str)(value)
+
+
+class _RiskRule:
+    """Parte fixa de um fator de risco; descrições com valores são montadas na serialização."""
+    __slots__ = ('key', 'factor', 'describe', 'importance', 'recommendation')
+
+    def __init__(self, key: str, factor: str, description: Union[str, Callable[[Dict[str, Any]], str]],
+                 feature: str, recommendation: str):
+        self.key = key
+        self.factor = factor
+        self.describe = description if callable(description) else (lambda values: description)
+        self.importance = FEATURE_IMPORTANCES[feature]
+        self.recommendation = recommendation
+
+    def to_dict(self, severity: int, values: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "factor": self.factor,
+            "description": self.describe(values),
+            "severity": _SEVERITIES[severity],
+            "importance": self.importance,
+            "recommendation": self.recommendation
+        }
+
+
+# Ordenadas uma vez por importância (features mais importantes primeiro)
+_RISK_RULES = tuple(sorted([
+    _RiskRule("hypertension", "Hipertensão",
+              lambda v: f"Pressão arterial elevada ({v['ap_hi']}/{v['ap_lo']} mmHg)",
+              'ap_hi', "Monitorar pressão diariamente e consultar cardiologista"),
+    _RiskRule("obesity", "Obesidade", lambda v: f"IMC elevado ({v['bmi']:.1f} kg/m²)",
+              'bmi', "Adotar dieta balanceada e programa de exercícios"),
+    _RiskRule("overweight", "Sobrepeso", lambda v: f"IMC acima do ideal ({v['bmi']:.1f} kg/m²)",
+              'bmi', "Controlar peso com alimentação saudável"),
+    _RiskRule("age", "Idade Avançada", lambda v: f"{v['age_years']} anos",
+              'age_years', "Check-ups cardiológicos regulares"),
+    _RiskRule("cholesterol", "Colesterol Elevado", "Colesterol acima do normal",
+              'cholesterol_high', "Dieta com baixo colesterol e possível medicação"),
+    _RiskRule("glucose", "Glicose Elevada", "Glicemia acima do normal",
+              'gluc_high', "Investigar diabetes e controlar açúcar"),
+    _RiskRule("smoke", "Tabagismo", "Fumante ativo",
+              'smoke', "PARAR DE FUMAR urgentemente"),
+    _RiskRule("sedentary", "Sedentarismo", "Não pratica atividade física regular",
+              'active', "Iniciar programa de exercícios (30 min/dia)"),
+    _RiskRule("alcohol", "Consumo de Álcool", "Consome bebidas alcoólicas",
+              'alco', "Reduzir ou evitar consumo de álcool"),
+], key=lambda rule: rule.importance, reverse=True))
+
+# Posição de cada regra em _RISK_RULES (ordem de importância)
+_RULE_RANK = {rule.key: rank for rank, rule in enumerate(_RISK_RULES)}
+
+_NO_RISK_FACTOR = {
+    "factor": "Nenhum Fator Identificado",
+    "description": "Perfil dentro dos parâmetros normais",
+    "severity": "BAIXO",
+    "importance": 0,
+    "recommendation": "Manter estilo de vida saudável"
+}
+
+_FEATURE_DISPLAY_NAMES = {
+    'gender': 'Gênero',
+    'ap_hi': 'Pressão Sistólica',
+    'ap_lo': 'Pressão Diastólica',
+    'smoke': 'Tabagismo',
+    'alco': 'Consumo de Álcool',
+    'active': 'Atividade Física',
+    'age_years': 'Idade',
+    'bmi': 'IMC',
+    'cholesterol_high': 'Colesterol Alto',
+    'gluc_high': 'Glicose Alta'
+}
+
+# (feature, nome, importância, importância %, formatação) em ordem decrescente de importância
+_FEATURES_BY_IMPORTANCE = tuple(
+    (feature, _FEATURE_DISPLAY_NAMES[feature], float(importance), float(importance * 100),
+     _VALUE_FORMATTERS.get(feature, str))
+    for feature, importance in sorted(FEATURE_IMPORTANCES.items(), key=lambda x: x[1], reverse=True)
+)
+
+# Conversão dos valores da matriz (float) para o tipo da resposta, por coluna
+_FEATURE_CASTS = tuple(int if name in INTEGER_FEATURES else float for name in FEATURE_NAMES)
+
+# Abaixo disso a matriz é convertida por linha (o custo fixo das 10 conversões
+# por coluna não compensa em uma ou poucas linhas)
+_COLUMNWISE_MIN_ROWS = 16
+
+
+def _row_risk_factors(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Regras de fatores de risco de uma linha (única implementação, usada em lote e por linha)."""
+    ap_hi, ap_lo, bmi, age = values['ap_hi'], values['ap_lo'], values['bmi'], values['age_years']
+    
+    # (posição em _RISK_RULES, gravidade) só das regras que disparam
+    hits = []
+    if ap_hi >= 140 or ap_lo >= 90:
+        hits.append((_RULE_RANK["hypertension"], _CRITICO if ap_hi >= 180 else _ALTO if ap_hi >= 140 else _MODERADO))
+    if bmi >= 30:
+        hits.append((_RULE_RANK["obesity"], _CRITICO if bmi >= 40 else _ALTO if bmi >= 35 else _MODERADO))
+    elif bmi >= 25:
+        hits.append((_RULE_RANK["overweight"], _MODERADO))
+    if age >= 60:
+        hits.append((_RULE_RANK["age"], _ALTO if age >= 70 else _MODERADO))
+    if values['cholesterol_high'] == 1:
+        hits.append((_RULE_RANK["cholesterol"], _ALTO))
+    if values['gluc_high'] == 1:
+        hits.append((_RULE_RANK["glucose"], _ALTO))
+    if values['smoke'] == 1:
+        hits.append((_RULE_RANK["smoke"], _ALTO))
+    if values['active'] == 0:
+        hits.append((_RULE_RANK["sedentary"], _MODERADO))
+    if values['alco'] == 1:
+        hits.append((_RULE_RANK["alcohol"], _MODERADO))
+    
+    if not hits:
+        return [dict(_NO_RISK_FACTOR)]
+    hits.sort()
+    return [_RISK_RULES[rank].to_dict(severity, values) for rank, severity in hits]
+
+
+def _error_result(message: str, recommendation: str) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "error": message,
+        "probability": 0,
+        "risk_level": "erro",
+        "risk_category": "erro",
+        "confidence": 0,
+        "recommendation": recommendation,
+        "top_risk_factors": [],
+        "feature_importance": []
+    }
+
+
+def _response(values: Dict[str, Any], probability: float, confidence: float, risk_class: int) -> Dict[str, Any]:
+    """Resposta completa de uma linha a partir de escalares Python."""
+    risk_level, risk_category, recommendation = _RISK_CLASSES[risk_class]
+    
+    return {
+        "success": True,
+        "probability": round(probability, 2),
+        "risk_level": risk_level,
+        "risk_category": risk_category,
+        "confidence": round(confidence, 2),
+        "recommendation": recommendation,
+        "top_risk_factors": _row_risk_factors(values),
+        "feature_importance": [
+            {
+                "feature": feature,
+                "feature_name": display_name,
+                "importance": importance,
+                "importance_percentage": percentage,
+                "value": values[feature],
+                "value_display": format_value(values[feature])
+            }
+            for feature, display_name, importance, percentage, format_value in _FEATURES_BY_IMPORTANCE
+        ]
+    }
+
+
+def _build_responses(X: np.ndarray, probability: np.ndarray, confidence: np.ndarray,
+                     risk_class: np.ndarray) -> List[Dict[str, Any]]:
+    """Monta as respostas de uma matriz já pontuada (uma conversão tolist por array)."""
+    if len(X) < _COLUMNWISE_MIN_ROWS:
+        rows = [
+            {name: cast(value) for name, cast, value in zip(FEATURE_NAMES, _FEATURE_CASTS, row)}
+            for row in X.tolist()
+        ]
+    else:
+        # Uma conversão por coluna, inteiros já como int: bem mais barato que
+        # converter valor a valor em lotes grandes
+        columns = [
+            X[:, j].astype(np.int64).tolist() if cast is int else X[:, j].tolist()
+            for j, cast in enumerate(_FEATURE_CASTS)
+        ]
+        rows = (dict(zip(FEATURE_NAMES, row)) for row in zip(*columns))
+    
+    return [
+        _response(values, p, c, r)
+        for values, p, c, r in zip(rows, probability.tolist(), confidence.tolist(), risk_class.tolist())
+    ]
+
+
+def _validation_error(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Resultado de erro se a linha for inválida (ou não puder ser validada), senão None."""
+    try:
+        valid, msg = validate_input(data)
+    except Exception as e:
+        return _error_result(str(e), "Erro ao processar dados")
+    return None if valid else _error_result(msg, "Corrija os dados e tente novamente")
+
+
 def predict_cardiovascular_risk(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Realiza a predição de risco cardiovascular.
@@ -171,112 +370,35 @@ def predict_cardiovascular_risk(patient_data: Dict[str, Any]) -> Dict[str, Any]:
             - top_risk_factors: List[Dict] (principais fatores de risco)
             - feature_importance: List[Dict] (importância de cada variável)
     """
-    try:
-        # Validar entrada
-        valid, msg = validate_input(patient_data)
-        if not valid:
-            return {
-                "success": False,
-                "error": msg,
-                "probability": 0,
-                "risk_level": "erro",
-                "risk_category": "erro",
-                "confidence": 0,
-                "recommendation": "Corrija os dados e tente novamente",
-                "top_risk_factors": [],
-                "feature_importance": []
-            }
-        
-        # Carregar modelo
-        model = load_model()
-        
-        # Preparar dados na ordem EXATA esperada pelo modelo
-        data_array = pd.DataFrame([{
-            'gender': int(patient_data['gender']),
-            'ap_hi': int(patient_data['ap_hi']),
-            'ap_lo': int(patient_data['ap_lo']),
-            'smoke': int(patient_data['smoke']),
-            'alco': int(patient_data['alco']),
-            'active': int(patient_data['active']),
-            'age_years': int(patient_data['age_years']),
-            'bmi': float(patient_data['bmi']),
-            'cholesterol_high': int(patient_data['cholesterol_high']),
-            'gluc_high': int(patient_data['gluc_high'])
-        }])
-        
-        # Fazer predição
-        probabilities = model.predict_proba(data_array)[0]
-        risk_probability = float(probabilities[1] * 100)  # Probabilidade de doença (classe 1)
-        confidence = float(max(probabilities) * 100)       # Confiança na predição
-        
-        # Classificar nível de risco
-        if risk_probability < 30:
-            risk_level = "baixo"
-            risk_category = "sem_risco"
-            recommendation = "✅ Seu risco cardiovascular é baixo. Mantenha hábitos saudáveis e faça check-ups regulares anuais."
-        elif risk_probability < 60:
-            risk_level = "médio"
-            risk_category = "risco_moderado"
-            recommendation = "⚠️ Seu risco cardiovascular é moderado. Consulte um médico para avaliação detalhada e considere mudanças no estilo de vida."
-        else:
-            risk_level = "alto"
-            risk_category = "alto_risco"
-            recommendation = "🚨 Seu risco cardiovascular é ALTO. Procure um cardiologista URGENTEMENTE para avaliação e acompanhamento médico."
-        
-        # Identificar fatores de risco presentes
-        risk_factors = identify_risk_factors(patient_data)
-        
-        # Montar lista de importância das features com valores do paciente
-        feature_importance_list = []
-        for feature, importance in sorted(FEATURE_IMPORTANCES.items(), key=lambda x: x[1], reverse=True):
-            value = patient_data[feature]
-            
-            # Formatar valor para exibição
-            if feature == 'gender':
-                value_display = "Masculino" if value == 1 else "Feminino"
-            elif feature in ['smoke', 'alco', 'active', 'cholesterol_high', 'gluc_high']:
-                value_display = "Sim" if value == 1 else "Não"
-            elif feature == 'bmi':
-                value_display = f"{value:.1f} kg/m²"
-            elif feature in ['ap_hi', 'ap_lo']:
-                value_display = f"{value} mmHg"
-            elif feature == 'age_years':
-                value_display = f"{value} anos"
-            else:
-                value_display = str(value)
-            
-            feature_importance_list.append({
-                "feature": feature,
-                "feature_name": get_feature_display_name(feature),
-                "importance": float(importance),
-                "importance_percentage": float(importance * 100),
-                "value": value,
-                "value_display": value_display
-            })
-        
-        return {
-            "success": True,
-            "probability": round(risk_probability, 2),
-            "risk_level": risk_level,
-            "risk_category": risk_category,
-            "confidence": round(confidence, 2),
-            "recommendation": recommendation,
-            "top_risk_factors": risk_factors,
-            "feature_importance": feature_importance_list
-        }
+    return predict_cardiovascular_risk_batch([patient_data])[0]
+
+
+def predict_cardiovascular_risk_batch(patients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Predição de risco para vários pacientes de uma vez.
+    
+    Cada linha é validada como em predict_cardiovascular_risk (uma linha
+    inválida vira erro só dela); o modelo pontua as linhas válidas de uma
+    vez e os dicionários de resposta são montados só no final.
+    
+    Args:
+        patients: Lista de dicionários (mesmo formato de predict_cardiovascular_risk)
         
+    Returns:
+        Lista de respostas, na mesma ordem da entrada
+    """
+    responses = [_validation_error(patient) for patient in patients]
+    valid = [patient for patient, error in zip(patients, responses) if error is None]
+    if not valid:
+        return responses
+    
+    try:
+        X = inference_core.prepare_matrix(inference_core.to_matrix(valid))
+        scored = iter(_build_responses(X, *inference_core.score_matrix(X)))
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "probability": 0,
-            "risk_level": "erro",
-            "risk_category": "erro",
-            "confidence": 0,
-            "recommendation": "Erro ao processar dados",
-            "top_risk_factors": [],
-            "feature_importance": []
-        }
+        return [error or _error_result(str(e), "Erro ao processar dados") for error in responses]
+    
+    return [error or next(scored) for error in responses]
 
 
 def identify_risk_factors(data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -289,129 +411,12 @@ def identify_risk_factors(data: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns:
         Lista de fatores de risco identificados, ordenados por importância
     """
-    factors = []
-    
-    # Pressão arterial
-    if data['ap_hi'] >= 140 or data['ap_lo'] >= 90:
-        severity = "CRÍTICO" if data['ap_hi'] >= 180 else "ALTO" if data['ap_hi'] >= 140 else "MODERADO"
-        factors.append({
-            "factor": "Hipertensão",
-            "description": f"Pressão arterial elevada ({data['ap_hi']}/{data['ap_lo']} mmHg)",
-            "severity": severity,
-            "importance": FEATURE_IMPORTANCES['ap_hi'],
-            "recommendation": "Monitorar pressão diariamente e consultar cardiologista"
-        })
-    
-    # IMC
-    if data['bmi'] >= 30:
-        severity = "CRÍTICO" if data['bmi'] >= 40 else "ALTO" if data['bmi'] >= 35 else "MODERADO"
-        factors.append({
-            "factor": "Obesidade",
-            "description": f"IMC elevado ({data['bmi']:.1f} kg/m²)",
-            "severity": severity,
-            "importance": FEATURE_IMPORTANCES['bmi'],
-            "recommendation": "Adotar dieta balanceada e programa de exercícios"
-        })
-    elif data['bmi'] >= 25:
-        factors.append({
-            "factor": "Sobrepeso",
-            "description": f"IMC acima do ideal ({data['bmi']:.1f} kg/m²)",
-            "severity": "MODERADO",
-            "importance": FEATURE_IMPORTANCES['bmi'],
-            "recommendation": "Controlar peso com alimentação saudável"
-        })
-    
-    # Idade
-    if data['age_years'] >= 60:
-        severity = "ALTO" if data['age_years'] >= 70 else "MODERADO"
-        factors.append({
-            "factor": "Idade Avançada",
-            "description": f"{data['age_years']} anos",
-            "severity": severity,
-            "importance": FEATURE_IMPORTANCES['age_years'],
-            "recommendation": "Check-ups cardiológicos regulares"
-        })
-    
-    # Colesterol alto
-    if data['cholesterol_high'] == 1:
-        factors.append({
-            "factor": "Colesterol Elevado",
-            "description": "Colesterol acima do normal",
-            "severity": "ALTO",
-            "importance": FEATURE_IMPORTANCES['cholesterol_high'],
-            "recommendation": "Dieta com baixo colesterol e possível medicação"
-        })
-    
-    # Glicose alta
-    if data['gluc_high'] == 1:
-        factors.append({
-            "factor": "Glicose Elevada",
-            "description": "Glicemia acima do normal",
-            "severity": "ALTO",
-            "importance": FEATURE_IMPORTANCES['gluc_high'],
-            "recommendation": "Investigar diabetes e controlar açúcar"
-        })
-    
-    # Tabagismo
-    if data['smoke'] == 1:
-        factors.append({
-            "factor": "Tabagismo",
-            "description": "Fumante ativo",
-            "severity": "ALTO",
-            "importance": FEATURE_IMPORTANCES['smoke'],
-            "recommendation": "PARAR DE FUMAR urgentemente"
-        })
-    
-    # Sedentarismo
-    if data['active'] == 0:
-        factors.append({
-            "factor": "Sedentarismo",
-            "description": "Não pratica atividade física regular",
-            "severity": "MODERADO",
-            "importance": FEATURE_IMPORTANCES['active'],
-            "recommendation": "Iniciar programa de exercícios (30 min/dia)"
-        })
-    
-    # Consumo de álcool
-    if data['alco'] == 1:
-        factors.append({
-            "factor": "Consumo de Álcool",
-            "description": "Consome bebidas alcoólicas",
-            "severity": "MODERADO",
-            "importance": FEATURE_IMPORTANCES['alco'],
-            "recommendation": "Reduzir ou evitar consumo de álcool"
-        })
-    
-    # Ordenar por importância (features mais importantes primeiro)
-    factors.sort(key=lambda x: x['importance'], reverse=True)
-    
-    if not factors:
-        factors.append({
-            "factor": "Nenhum Fator Identificado",
-            "description": "Perfil dentro dos parâmetros normais",
-            "severity": "BAIXO",
-            "importance": 0,
-            "recommendation": "Manter estilo de vida saudável"
-        })
-    
-    return factors
+    return _row_risk_factors(data)
 
 
 def get_feature_display_name(feature: str) -> str:
     """Retorna nome amigável para cada feature."""
-    names = {
-        'gender': 'Gênero',
-        'ap_hi': 'Pressão Sistólica',
-        'ap_lo': 'Pressão Diastólica',
-        'smoke': 'Tabagismo',
-        'alco': 'Consumo de Álcool',
-        'active': 'Atividade Física',
-        'age_years': 'Idade',
-        'bmi': 'IMC',
-        'cholesterol_high': 'Colesterol Alto',
-        'gluc_high': 'Glicose Alta'
-    }
-    return names.get(feature, feature)
+    return _FEATURE_DISPLAY_NAMES.get(feature, feature)
 
 
 # ==================== FUNÇÕES AUXILIARES ====================
@@ -424,25 +429,288 @@ def get_model_info() -> Dict[str, Any]:
         Dicionário com informações do modelo
     """
     try:
-        model = load_model()
-        classifier = model.named_steps['classifier']
+        info = inference_core.model_info()
         
         return {
-            "model_type": "RandomForestClassifier",
-            "n_estimators": classifier.n_estimators,
-            "max_depth": classifier.max_depth,
-            "n_features": len(FEATURE_NAMES),
-            "feature_names": FEATURE_NAMES,
-            "preprocessing": ["RobustScaler"],
-            "feature_importances": FEATURE_IMPORTANCES
+            "model_type": info["model_type"],
+            "n_estimators": info["n_estimators"],
+            "max_depth": info["max_depth"],
+            "n_features": info["n_features"],
+            "feature_names": info["feature_names"],
+            "preprocessing": info["preprocessing"],
+            "feature_importances": info["feature_importances"]
         }
     except Exception as e:
         return {"error": str(e)}
 
 
+# ==================== EXPORTAÇÃO PARA O DISPOSITIVO ====================
+
+# Identificação do formato do blob exportado. Incrementar a versão sempre que
+# a estrutura mudar, para que o avaliador JS recuse blobs que não entende.
+EXPORT_FORMAT = "lifebeat-rf"
+EXPORT_FORMAT_VERSION = 2
+
+# Pasta padrão dos artefatos exportados
+EXPORT_DIR = Path(__file__).parent / 'exports'
+
+# Diferença máxima aceita entre o avaliador de referência e o scikit-learn
+EXPORT_TOLERANCE = 1e-12
+
+
+def _to_float32(value: float) -> float:
+    """
+    Arredonda um float64 para float32.
+    
+    O scikit-learn converte a entrada para float32 antes de percorrer as
+    árvores; o avaliador precisa fazer o mesmo (Math.fround no JS) para
+    cair no mesmo lado dos limiares.
+    """
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+
+def _float32_thresholds(threshold: np.ndarray) -> List[float]:
+    """
+    Limiares float64 → maior float32 que não passa do limiar.
+    
+    Como a entrada já é float32, `x <= t` equivale a `x <= floor32(t)`, e o
+    float32 cabe no JSON com a representação curta (ex.: 0.25, 1.5).
+    """
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(float) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return [float(np.format_float_positional(t, unique=True)) for t in t32]
+
+
+def build_device_export(model, model_sha256: str) -> Dict[str, Any]:
+    """
+    Serializa o pipeline (RobustScaler + Random Forest) em um blob compacto.
+    
+    Cada árvore é achatada em vetores paralelos só com os nós internos
+    (feature, threshold, left, right) e um vetor value só com as folhas
+    (probabilidade da classe 1). Filhos >= 0 apontam para nós internos;
+    filho negativo c aponta para a folha -c - 1. Limiares vão em float32.
+    
+    Args:
+        model: Pipeline treinado
+        model_sha256: Versão do artefato de onde o pipeline foi lido
+            (gravada no blob para o app saber qual modelo está avaliando)
+        
+    Returns:
+        Dicionário serializável em JSON
+    """
+    *preprocessing, (_, classifier) = model.steps
+    if len(preprocessing) != 1 or not hasattr(preprocessing[0][1], 'scale_'):
+        raise ValueError("Exportação suporta apenas pipelines RobustScaler + RandomForestClassifier")
+    scaler = preprocessing[0][1]
+    
+    n_features = len(FEATURE_NAMES)
+    center = scaler.center_ if scaler.center_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    positive_index = list(classifier.classes_).index(1)
+    
+    trees = []
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        values = tree.value[is_leaf, 0, :]
+        totals = values.sum(axis=1)
+        totals[totals == 0] = 1.0
+        
+        # Renumera: nós internos 0..k-1, folhas -1, -2, ... (na ordem original)
+        new_index = np.empty(tree.node_count, dtype=np.int64)
+        new_index[~is_leaf] = np.arange((~is_leaf).sum())
+        new_index[is_leaf] = -1 - np.arange(is_leaf.sum())
+        internal = ~is_leaf
+        
+        trees.append({
+            "feature": tree.feature[internal].tolist(),
+            "threshold": _float32_thresholds(tree.threshold[internal]),
+            "left": new_index[tree.children_left[internal]].tolist(),
+            "right": new_index[tree.children_right[internal]].tolist(),
+            "value": (values[:, positive_index] / totals).tolist()
+        })
+    
+    return {
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_FORMAT_VERSION,
+        "model_sha256": model_sha256,
+        "feature_names": FEATURE_NAMES,
+        "scaler": {
+            "center": [float(c) for c in center],
+            "scale": [float(s) for s in scale]
+        },
+        "trees": trees
+    }
+
+
+def predict_proba_from_export(blob: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[float]:
+    """
+    Avaliador de referência do blob exportado.
+    
+    Implementado em Python puro, passo a passo, como deve ser o avaliador
+    JS do app: escala em float64, arredonda para float32, percorre cada
+    árvore e tira a média das probabilidades das folhas.
+    
+    Args:
+        blob: Blob gerado por build_device_export
+        rows: Lista de dicionários com as 10 features
+        
+    Returns:
+        Probabilidade da classe 1 (0-1) para cada linha
+    """
+    if blob.get("format") != EXPORT_FORMAT or blob.get("version") != EXPORT_FORMAT_VERSION:
+        raise ValueError(
+            f"Formato não suportado: {blob.get('format')} v{blob.get('version')} "
+            f"(esperado {EXPORT_FORMAT} v{EXPORT_FORMAT_VERSION})"
+        )
+    
+    center = blob["scaler"]["center"]
+    scale = blob["scaler"]["scale"]
+    feature_names = blob["feature_names"]
+    trees = blob["trees"]
+    
+    # Ao carregar o blob: limiares de volta para float32 (Math.fround)
+    thresholds = [[_to_float32(t) for t in tree["threshold"]] for tree in trees]
+    
+    probabilities = []
+    for row in rows:
+        x = [
+            _to_float32((float(row[name]) - center[i]) / scale[i])
+            for i, name in enumerate(feature_names)
+        ]
+        
+        total = 0.0
+        for tree, threshold in zip(trees, thresholds):
+            feature, left, right = tree["feature"], tree["left"], tree["right"]
+            node = 0 if feature else -1  # árvore só com a raiz-folha
+            while node >= 0:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            total += tree["value"][-node - 1]
+        
+        probabilities.append(total / len(trees))
+    
+    return probabilities
+
+
+def build_conformance_vectors(model, blob: Dict[str, Any], n_samples: int = 200, seed: int = 42) -> Dict[str, Any]:
+    """
+    Gera vetores de conformidade (entrada → probabilidade esperada).
+    
+    Inclui pacientes aleatórios dentro das faixas válidas e casos em que
+    uma feature contínua cai exatamente sobre um limiar de divisão, que é
+    onde erros de arredondamento do avaliador aparecem.
+    
+    Args:
+        model: Pipeline treinado (fonte da verdade)
+        blob: Blob exportado do mesmo modelo
+        n_samples: Quantidade de pacientes aleatórios
+        seed: Semente para tornar o arquivo reprodutível
+        
+    Returns:
+        Dicionário com os vetores e a tolerância esperada
+    """
+    rng = np.random.default_rng(seed)
+    
+    ap_hi = rng.integers(90, 221, n_samples)
+    rows = pd.DataFrame({
+        'gender': rng.integers(0, 2, n_samples),
+        'ap_hi': ap_hi,
+        'ap_lo': np.minimum(rng.integers(50, 131, n_samples), ap_hi - 10),
+        'smoke': rng.integers(0, 2, n_samples),
+        'alco': rng.integers(0, 2, n_samples),
+        'active': rng.integers(0, 2, n_samples),
+        'age_years': rng.integers(18, 91, n_samples),
+        'bmi': np.round(rng.uniform(16.0, 45.0, n_samples), 1),
+        'cholesterol_high': rng.integers(0, 2, n_samples),
+        'gluc_high': rng.integers(0, 2, n_samples)
+    }, columns=FEATURE_NAMES).astype({'bmi': float})
+    
+    # Casos sobre os limiares (desfaz a escala do limiar para o valor bruto)
+    center = blob["scaler"]["center"]
+    scale = blob["scaler"]["scale"]
+    splits = (
+        (feature, threshold)
+        for tree in blob["trees"][:5]
+        for feature, threshold in zip(tree["feature"], tree["threshold"])
+        if FEATURE_NAMES[feature] in ('ap_hi', 'ap_lo', 'age_years', 'bmi')
+    )
+    boundary_rows = []
+    for i, (feature, threshold) in enumerate(islice(splits, n_samples // 4)):
+        row = rows.iloc[i % n_samples].to_dict()
+        row[FEATURE_NAMES[feature]] = threshold * scale[feature] + center[feature]
+        boundary_rows.append(row)
+    rows = pd.concat([rows.astype(float), pd.DataFrame(boundary_rows, columns=FEATURE_NAMES)], ignore_index=True)
+    
+    expected = model.predict_proba(rows)[:, list(model.classes_).index(1)]
+    records = rows.to_dict(orient='records')
+    reference = predict_proba_from_export(blob, records)
+    
+    max_diff = float(np.max(np.abs(np.asarray(reference) - expected)))
+    if max_diff > EXPORT_TOLERANCE:
+        raise ValueError(f"Avaliador de referência diverge do modelo (diferença máxima {max_diff:.3e})")
+    
+    return {
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_FORMAT_VERSION,
+        "model_sha256": blob["model_sha256"],
+        "tolerance": EXPORT_TOLERANCE,
+        "vectors": [
+            {"input": record, "probability": float(p)}
+            for record, p in zip(records, expected)
+        ]
+    }
+
+
+def export_model_for_device(output_path: Optional[Path] = None,
+                            vectors_path: Optional[Path] = None,
+                            n_vectors: int = 200) -> Dict[str, Any]:
+    """
+    Exporta o modelo carregado para avaliação local no app React Native.
+    
+    Grava o blob compacto e o arquivo de vetores de conformidade. A API
+    continua responsável pelas explicações e por qualquer requisição que
+    o app não consiga avaliar (ex.: versão de blob desconhecida).
+    
+    Args:
+        output_path: Destino do blob (padrão: ml/exports/random_forest_v<versão>.json)
+        vectors_path: Destino dos vetores (padrão: ml/exports/conformance_vectors.json)
+        n_vectors: Quantidade de pacientes aleatórios nos vetores
+        
+    Returns:
+        Resumo da exportação (caminhos, nº de árvores e de nós, tamanho em bytes)
+    """
+    # Modelo e versão do mesmo carregamento (um reload no meio não os mistura)
+    loaded = inference_core.MODEL.get()
+    model = loaded.model
+    
+    output_path = Path(output_path or EXPORT_DIR / f'random_forest_v{EXPORT_FORMAT_VERSION}.json')
+    vectors_path = Path(vectors_path or EXPORT_DIR / 'conformance_vectors.json')
+    
+    blob = build_device_export(model, loaded.version)
+    vectors = build_conformance_vectors(model, blob, n_samples=n_vectors)
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    vectors_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(blob, f, separators=(',', ':'))
+    with open(vectors_path, 'w', encoding='utf-8') as f:
+        json.dump(vectors, f, indent=1)
+    
+    return {
+        "output_path": str(output_path),
+        "vectors_path": str(vectors_path),
+        "n_trees": len(blob["trees"]),
+        "n_nodes": sum(len(tree["feature"]) + len(tree["value"]) for tree in blob["trees"]),
+        "n_vectors": len(vectors["vectors"]),
+        "size_bytes": output_path.stat().st_size
+    }
+
+
 # ==================== EXEMPLO DE USO ====================
 
-if __name__ == "__main__":
+def _run_demo():
+    """Executa uma predição de exemplo e imprime o resultado."""
     print("=" * 70)
     print("🧠 TESTE DO SERVIÇO DE PREDIÇÃO CARDIOVASCULAR")
     print("=" * 70)
@@ -487,3 +755,26 @@ if __name__ == "__main__":
         print(f"\n❌ ERRO: {resultado['error']}")
     
     print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serviço de predição cardiovascular")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    export_parser = subparsers.add_parser('export', help="Exporta o modelo para avaliação no app")
+    export_parser.add_argument('--output', type=Path, help="Caminho do blob JSON")
+    export_parser.add_argument('--vectors', type=Path, help="Caminho dos vetores de conformidade")
+    export_parser.add_argument('--n-vectors', type=int, default=200, help="Pacientes aleatórios nos vetores")
+    
+    args = parser.parse_args()
+    
+    if args.command == 'export':
+        resumo = export_model_for_device(args.output, args.vectors, args.n_vectors)
+        print(f"✅ Blob exportado: {resumo['output_path']} ({resumo['n_trees']} árvores, "
+              f"{resumo['n_nodes']} nós, {resumo['size_bytes'] / 1024:.1f} KB, "
+              f"{resumo['size_bytes'] / resumo['n_nodes']:.1f} B/nó)")
+        print(f"✅ Vetores de conformidade: {resumo['vectors_path']} ({resumo['n_vectors']} casos)")
+    else:
+        _run_demo()
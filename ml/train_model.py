@@ -0,0 +1,410 @@
+"""
+🏋️ Treinamento do Modelo - Predição de Risco Cardiovascular
+
+Gera o artefato servido pela API e pelo ml_service
+(`random_forest_pipeline.joblib`) a partir de um CSV local, junto com um
+arquivo de metadados (importâncias, métricas, ordem das features, tempo
+de treino, amostra e perfil de referência dos dados).
+
+Pipeline: RobustScaler + RandomForestClassifier
+Entrada: CSV com as 10 colunas de FEATURE_NAMES + coluna alvo (padrão: cardio)
+
+Uso:
+    # Treino completo (árvores e validação cruzada em todos os núcleos)
+    python train_model.py dados.csv
+
+    # Adicionar 50 árvores ao modelo existente sem retreinar as anteriores
+    # (métricas em um holdout do CSV novo, não em validação cruzada)
+    python train_model.py novos_dados.csv --warm-start --add-trees 50
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import RobustScaler
+
+from inference_core import (
+    BINARY_FEATURES, FEATURE_NAMES, MODEL_PATH, file_sha256, metadata_path_for, valid_rows
+)
+
+# ==================== CONFIGURAÇÃO ====================
+
+# Tipos compactos para a leitura do CSV (evita int64/float64 por coluna)
+CSV_DTYPES = {
+    'gender': 'int8',
+    'ap_hi': 'int16',
+    'ap_lo': 'int16',
+    'smoke': 'int8',
+    'alco': 'int8',
+    'active': 'int8',
+    'age_years': 'int16',
+    'bmi': 'float32',
+    'cholesterol_high': 'int8',
+    'gluc_high': 'int8'
+}
+
+# Hiperparâmetros do modelo servido
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'random_state': 42
+}
+
+CV_SCORING = ['accuracy', 'precision', 'recall', 'f1', 'roc_auc']
+
+# Fração do CSV novo reservada para avaliar o modelo estendido (--warm-start)
+WARM_START_HOLDOUT = 0.2
+
+# Linhas de referência gravadas nos metadados (curvas de dependência parcial da API)
+BACKGROUND_SAMPLE_SIZE = 500
+
+# Perfil de referência para o monitor de drift da API
+DRIFT_CONTINUOUS_FEATURES = ['ap_hi', 'ap_lo', 'age_years', 'bmi']
+DRIFT_BINS = 10
+
+
+# ==================== DADOS ====================
+
+def load_dataset(csv_path: Path, target: str = 'cardio',
+                 chunksize: int = 100_000) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    """
+    Lê o CSV em blocos, descartando linhas inválidas bloco a bloco.
+
+    Só as 10 features e o alvo são lidos. Cada bloco é convertido para
+    número (células vazias ou não numéricas viram NaN), validado com as
+    mesmas regras da API e só então reduzido aos tipos compactos de
+    CSV_DTYPES, então o pico de memória fica limitado ao tamanho de um
+    bloco mais o resultado.
+
+    Args:
+        csv_path: Caminho do CSV
+        target: Nome da coluna alvo (0/1)
+        chunksize: Linhas por bloco
+
+    Returns:
+        Tupla (X, y, linhas descartadas)
+
+    Raises:
+        ValueError: Se nenhuma linha for válida
+    """
+    columns = FEATURE_NAMES + [target]
+    dtypes = dict(CSV_DTYPES, **{target: 'int8'})
+    chunks = []
+    dropped = 0
+
+    reader = pd.read_csv(csv_path, usecols=columns, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[columns].apply(pd.to_numeric, errors='coerce')
+
+        # Mesmas regras aplicadas às entradas da API (NaN e inteiros com
+        # parte fracionária são inválidos)
+        valid = valid_rows(chunk[FEATURE_NAMES].to_numpy(dtype=float), strict_integers=True)
+        valid &= chunk[target].isin([0, 1]).to_numpy()
+
+        dropped += int((~valid).sum())
+        chunks.append(chunk[valid].astype(dtypes))
+
+    data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    if data.empty:
+        raise ValueError(f"❌ Nenhuma linha válida em {csv_path} ({dropped} descartadas)")
+    return data[FEATURE_NAMES], data[target].to_numpy(), dropped
+
+
+def build_reference_profile(X: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Perfil das features no treino, usado pela API para medir drift (PSI).
+
+    Features contínuas: limites dos decis e fração de linhas em cada faixa
+    (faixa i = valores com edges[i-1] <= x < edges[i]). Binárias: taxa de 1s.
+    """
+    profile = {"n_samples": int(len(X)), "continuous": {}, "binary": {}}
+
+    for feature in DRIFT_CONTINUOUS_FEATURES:
+        values = X[feature].to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, DRIFT_BINS + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        profile["continuous"][feature] = {
+            "edges": edges.tolist(),
+            "fractions": (counts / len(values)).tolist()
+        }
+
+    for feature in BINARY_FEATURES:
+        profile["binary"][feature] = float(X[feature].mean())
+
+    return profile
+
+
+def merge_reference_profile(profile: Dict[str, Any], X: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Soma as linhas de X a um perfil existente, mantendo as faixas dele.
+
+    Usado no warm_start: o modelo estendido continua refletindo os dados
+    originais, então o perfil não pode virar só o do CSV novo.
+    """
+    n_old, n_new = profile["n_samples"], len(X)
+    n_total = n_old + n_new
+    merged = {"n_samples": int(n_total), "continuous": {}, "binary": {}}
+
+    for feature, spec in profile["continuous"].items():
+        edges = np.asarray(spec["edges"], dtype=float)
+        counts = np.bincount(
+            np.searchsorted(edges, X[feature].to_numpy(dtype=float), side='right'),
+            minlength=len(edges) + 1
+        )
+        fractions = (np.asarray(spec["fractions"]) * n_old + counts) / n_total
+        merged["continuous"][feature] = {"edges": spec["edges"], "fractions": fractions.tolist()}
+
+    for feature, rate in profile["binary"].items():
+        merged["binary"][feature] = float((rate * n_old + X[feature].sum()) / n_total)
+
+    return merged
+
+
+# ==================== TREINAMENTO ====================
+
+def build_pipeline(n_jobs: int = -1, **params) -> Pipeline:
+    """
+    Cria o pipeline RobustScaler + RandomForestClassifier.
+
+    Args:
+        n_jobs: Núcleos usados para treinar as árvores (-1 = todos)
+        **params: Sobrescreve DEFAULT_PARAMS do classificador
+    """
+    classifier_params = dict(DEFAULT_PARAMS, **params)
+    return Pipeline([
+        ('scaler', RobustScaler()),
+        ('classifier', RandomForestClassifier(n_jobs=n_jobs, **classifier_params))
+    ])
+
+
+def cross_validate_pipeline(pipeline: Pipeline, X: pd.DataFrame, y: np.ndarray,
+                            folds: int = 5, n_jobs: int = -1,
+                            random_state: int = 42) -> Dict[str, Dict[str, float]]:
+    """
+    Validação cruzada estratificada com os folds em paralelo.
+
+    O paralelismo fica nos folds; dentro de cada fold a floresta roda com
+    n_jobs=1 para não disputar núcleos.
+
+    Returns:
+        Dicionário {métrica: {"mean": ..., "std": ...}}
+    """
+    cv_pipeline = clone(pipeline).set_params(classifier__n_jobs=1)
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    scores = cross_validate(cv_pipeline, X, y, cv=cv, scoring=CV_SCORING, n_jobs=n_jobs)
+
+    return {
+        metric: {
+            "mean": float(np.mean(scores[f'test_{metric}'])),
+            "std": float(np.std(scores[f'test_{metric}']))
+        }
+        for metric in CV_SCORING
+    }
+
+
+def holdout_metrics(pipeline: Pipeline, X: pd.DataFrame, y: np.ndarray) -> Dict[str, float]:
+    """Métricas de CV_SCORING do pipeline já treinado em um conjunto reservado."""
+    return {metric: float(get_scorer(metric)(pipeline, X, y)) for metric in CV_SCORING}
+
+
+def add_trees(pipeline: Pipeline, X: pd.DataFrame, y: np.ndarray, n_new_trees: int) -> Pipeline:
+    """
+    Adiciona árvores a um pipeline já treinado (warm_start).
+
+    O RobustScaler NÃO é reajustado: as árvores existentes foram treinadas
+    na escala antiga, então as novas precisam usar a mesma.
+    """
+    scaler = pipeline.named_steps['scaler']
+    classifier = pipeline.named_steps['classifier']
+
+    classifier.set_params(warm_start=True, n_estimators=classifier.n_estimators + n_new_trees)
+    classifier.fit(scaler.transform(X), y)
+    classifier.set_params(warm_start=False)
+    return pipeline
+
+
+def train(csv_path: Path, output_path: Path = MODEL_PATH, target: str = 'cardio',
+          warm_start: bool = False, n_new_trees: int = 50, folds: int = 5,
+          n_jobs: int = -1, chunksize: int = 100_000,
+          params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Treina (ou estende) o modelo e grava artefato + metadados.
+
+    Args:
+        csv_path: CSV de treino
+        output_path: Destino do .joblib (metadados ficam ao lado)
+        target: Coluna alvo
+        warm_start: Se True, carrega output_path e só adiciona árvores
+            (avaliado em um holdout de WARM_START_HOLDOUT do CSV, sem CV)
+        n_new_trees: Árvores adicionadas no modo warm_start
+        folds: Folds da validação cruzada (0 = pular; ignorado no warm_start)
+        n_jobs: Núcleos usados (-1 = todos)
+        chunksize: Linhas por bloco na leitura do CSV
+        params: Hiperparâmetros do classificador
+
+    Returns:
+        Metadados gravados
+    """
+    output_path = Path(output_path)
+
+    print(f"📂 Lendo dados de: {csv_path}")
+    X, y, dropped = load_dataset(csv_path, target=target, chunksize=chunksize)
+    print(f"   {len(X)} linhas válidas ({dropped} descartadas)")
+
+    metrics, holdout, evaluation = {}, {}, {"method": None}
+    previous = {}
+    if warm_start:
+        print(f"📦 Carregando modelo existente de: {output_path}")
+        pipeline = joblib.load(output_path)
+        pipeline.set_params(classifier__n_jobs=n_jobs)
+        if metadata_path_for(output_path).exists():
+            with open(metadata_path_for(output_path), encoding='utf-8') as f:
+                previous = json.load(f)
+
+        # Validação cruzada reajustaria a floresta base k vezes (e mediria um
+        # modelo novo, não o estendido): avalia o estendido em um holdout
+        X, X_holdout, y, y_holdout = train_test_split(
+            X, y, test_size=WARM_START_HOLDOUT, stratify=y,
+            random_state=pipeline.named_steps['classifier'].random_state or 0
+        )
+    else:
+        pipeline = build_pipeline(n_jobs=n_jobs, **(params or {}))
+
+        if folds > 1:
+            print(f"🔁 Validação cruzada ({folds} folds)...")
+            metrics = cross_validate_pipeline(
+                pipeline, X, y, folds=folds, n_jobs=n_jobs,
+                random_state=pipeline.named_steps['classifier'].random_state or 0
+            )
+            evaluation = {"method": "cross_validation", "folds": folds}
+
+    print("🌲 Treinando floresta...")
+    start = time.perf_counter()
+    if warm_start:
+        add_trees(pipeline, X, y, n_new_trees)
+    else:
+        pipeline.fit(X, y)
+    training_seconds = time.perf_counter() - start
+
+    if warm_start:
+        print(f"🎯 Avaliando modelo estendido em {len(X_holdout)} linhas reservadas...")
+        holdout = holdout_metrics(pipeline, X_holdout, y_holdout)
+        evaluation = {"method": "holdout", "holdout_fraction": WARM_START_HOLDOUT,
+                      "holdout_rows": int(len(X_holdout)), "base_cv_metrics": previous.get("cv_metrics")}
+
+    # Servido com um núcleo por predição: com n_jobs=-1 cada /predict de uma
+    # linha espalharia o trabalho em todos os núcleos
+    pipeline.set_params(classifier__n_jobs=None)
+
+    # Grava em arquivo temporário e troca de uma vez, para que um servidor
+    # lendo o artefato nunca veja um arquivo pela metade
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix('.joblib.tmp')
+    joblib.dump(pipeline, tmp_path)
+
+    classifier = pipeline.named_steps['classifier']
+    background = X.sample(n=min(BACKGROUND_SAMPLE_SIZE, len(X)), random_state=classifier.random_state)
+    background = background.astype(float).round(2).to_numpy().tolist()
+    profile = build_reference_profile(X)
+    if warm_start and previous.get("reference_profile"):
+        # O modelo estendido ainda reflete os dados originais
+        background = previous.get("background_sample") or background
+        profile = merge_reference_profile(previous["reference_profile"], X)
+
+    metadata = {
+        "model_sha256": file_sha256(tmp_path),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "feature_names": FEATURE_NAMES,
+        "target": target,
+        "n_samples": int(len(X)),
+        "n_dropped": dropped,
+        "class_balance": float(np.mean(y)),
+        "params": {
+            "n_estimators": classifier.n_estimators,
+            "max_depth": classifier.max_depth,
+            "random_state": classifier.random_state
+        },
+        "warm_start": warm_start,
+        "training_seconds": round(training_seconds, 3),
+        "evaluation": evaluation,
+        "cv_metrics": metrics,
+        "holdout_metrics": holdout,
+        "feature_importances": dict(zip(FEATURE_NAMES, map(float, classifier.feature_importances_))),
+        "background_sample": background,
+        "reference_profile": profile
+    }
+
+    # Metadados também via arquivo temporário; o model_sha256 permite a quem
+    # carrega detectar a janela entre as duas trocas
+    metadata_path = metadata_path_for(output_path)
+    tmp_metadata_path = metadata_path.with_suffix('.json.tmp')
+    with open(tmp_metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    os.replace(tmp_metadata_path, metadata_path)
+
+    return metadata
+
+
+# ==================== EXECUÇÃO ====================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treina o modelo de risco cardiovascular")
+    parser.add_argument('csv', type=Path, help="CSV com FEATURE_NAMES + coluna alvo")
+    parser.add_argument('--output', type=Path, default=MODEL_PATH, help="Destino do .joblib")
+    parser.add_argument('--target', default='cardio', help="Coluna alvo (0/1)")
+    parser.add_argument('--warm-start', action='store_true', help="Adiciona árvores ao modelo existente")
+    parser.add_argument('--add-trees', type=int, default=50, help="Árvores adicionadas com --warm-start")
+    parser.add_argument('--folds', type=int, default=5, help="Folds da validação cruzada (0 = pular)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Núcleos usados (-1 = todos)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Linhas por bloco na leitura")
+    parser.add_argument('--n-estimators', type=int, default=DEFAULT_PARAMS['n_estimators'])
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_PARAMS['max_depth'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_PARAMS['random_state'])
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🏋️ TREINAMENTO DO MODELO CARDIOVASCULAR")
+    print("=" * 70)
+
+    metadata = train(
+        args.csv,
+        output_path=args.output,
+        target=args.target,
+        warm_start=args.warm_start,
+        n_new_trees=args.add_trees,
+        folds=args.folds,
+        n_jobs=args.n_jobs,
+        chunksize=args.chunksize,
+        params={
+            'n_estimators': args.n_estimators,
+            'max_depth': args.max_depth,
+            'random_state': args.seed
+        }
+    )
+
+    print(f"\n✅ Modelo salvo em: {args.output}")
+    print(f"  • Árvores: {metadata['params']['n_estimators']}")
+    print(f"  • Tempo de treino: {metadata['training_seconds']:.1f}s")
+    for metric, values in metadata['cv_metrics'].items():
+        print(f"  • {metric}: {values['mean']:.4f} ± {values['std']:.4f}")
+    if metadata['holdout_metrics']:
+        print(f"  • Modelo estendido, holdout de {metadata['evaluation']['holdout_rows']} linhas:")
+        for metric, value in metadata['holdout_metrics'].items():
+            print(f"    - {metric}: {value:.4f}")
+    print("=" * 70)